@@ -0,0 +1,166 @@
+# allergen_index.py
+import re
+import numpy as np
+from plan_cache import LRUCache
+
+_TOKEN = re.compile(r'\w+')
+
+
+class AllergenIndex:
+    """
+    Substring matching of allergens / search terms against food text (name, plus ingredients when
+    the catalog has that column), with the same result as `term.lower() in text.lower()` per food.
+    - text is split once into word tokens; the sorted vocabulary and each token's postings (rows using it)
+      are stored CSR-style in flat arrays, so the index can be shared like the recommender's other arrays;
+    - a term's word pieces are looked up in the vocabulary, not the foods: exact tokens by binary search,
+      tokens containing the piece (e.g. "nut" in "peanut") by one vectorized scan over the vocabulary;
+    - single-word terms are answered from postings alone; terms spanning several words (e.g.
+      "peanut butter") take the rows of their rarest piece and verify the full substring on those only;
+    - row sets are memoized per term in a bounded LRU, so repeated allergies cost O(matching rows).
+    """
+
+    # arrays that fully describe a built index (see state / from_state)
+    STATE_ARRAYS = ('texts', 'vocab', 'post_indptr', 'post_rows')
+
+    def __init__(self, texts, memo_size=1024):
+        texts = np.char.lower(np.asarray(texts, dtype=str))
+        vocab, tok_rows, tok_ids = _tokenize(texts, 0)
+        self._init(texts, vocab, *_postings(tok_ids, tok_rows, len(vocab)), memo_size=memo_size)
+
+    def _init(self, texts, vocab, post_indptr, post_rows, memo_size=1024):
+        self._texts = texts
+        self.n_rows = len(texts)
+        self.vocab = vocab
+        self.post_indptr = post_indptr
+        self.post_rows = post_rows
+        self._memo = LRUCache(memo_size)
+
+    def state(self):
+        """The index arrays, so another process can rebuild it with from_state without re-tokenizing."""
+        return {'texts': self._texts, 'vocab': self.vocab, 'post_indptr': self.post_indptr, 'post_rows': self.post_rows}
+
+    @classmethod
+    def from_state(cls, arrays, memo_size=1024):
+        """Rebuild from state() output (arrays are used as-is, not copied)."""
+        index = cls.__new__(cls)
+        index._init(arrays['texts'], arrays['vocab'], arrays['post_indptr'], arrays['post_rows'], memo_size=memo_size)
+        return index
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        return cls(cls.catalog_texts(catalog))
+
+    def extend(self, texts):
+        """
+        Append rows for new foods: only the new texts are tokenized; their postings are merged into the
+        existing arrays (vocabulary ids are remapped, no re-tokenizing of the catalog). Clears the memo.
+        """
+        texts = np.char.lower(np.asarray(texts, dtype=str))
+        if len(texts) == 0:
+            return
+        new_vocab, new_rows, new_ids = _tokenize(texts, self.n_rows)
+        vocab = np.union1d(self.vocab, new_vocab)
+        ptr = self.post_indptr
+        old_ids = np.repeat(np.searchsorted(vocab, self.vocab), np.diff(ptr))
+        # old pairs come first, so rows stay ascending within each token after the stable sort
+        tok_ids = np.concatenate([old_ids, np.searchsorted(vocab, new_vocab)[new_ids]])
+        tok_rows = np.concatenate([np.asarray(self.post_rows), new_rows])
+        self.post_indptr, self.post_rows = _postings(tok_ids, tok_rows, len(vocab))
+        self.vocab = vocab
+        self._texts = np.concatenate([np.asarray(self._texts), texts])
+        self.n_rows = len(self._texts)
+        self._memo.clear()
+
+    @staticmethod
+    def catalog_texts(catalog, rows=None):
+        """Text indexed for catalog rows: the name, plus the ingredients when the catalog has them."""
+        names = np.asarray(catalog.columns['name'], dtype=str)
+        ingredients = catalog.columns.get('ingredients')
+        if ingredients is not None:
+            names = np.char.add(np.char.add(names, '\n'), np.asarray(ingredients, dtype=str))
+        return names if rows is None else names[rows]
+
+    def _token_ids(self, piece):
+        """Vocabulary ids of the tokens containing piece (the exact token, if any, among them)."""
+        vocab = self.vocab
+        if len(vocab) == 0:
+            return np.empty(0, dtype=np.int64)
+        i = int(np.searchsorted(vocab, piece))
+        if i == len(vocab) or not vocab[i].startswith(piece):
+            # no token starts with the piece; it can still sit inside one (e.g. "nut" in "peanut")
+            return np.flatnonzero(np.char.find(vocab, piece) > 0)
+        # tokens starting with the piece (exact hit first) are contiguous in the sorted vocabulary;
+        # only tokens containing it later on need the vectorized scan
+        end = int(np.searchsorted(vocab, piece + '\U0010ffff'))
+        return np.union1d(np.arange(i, end), np.flatnonzero(np.char.find(vocab, piece) > 0))
+
+    def _rows_for(self, token_ids):
+        """Union of the postings of token_ids, gathered without a Python loop over tokens."""
+        ptr = self.post_indptr
+        starts, lengths = ptr[token_ids], ptr[token_ids + 1] - ptr[token_ids]
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        return np.unique(self.post_rows[offsets])
+
+    def _lookup(self, term):
+        pieces = _TOKEN.findall(term)
+        if not pieces:
+            # nothing to look up (empty or punctuation-only term): plain scan
+            return np.flatnonzero(np.char.find(self._texts, term) >= 0)
+        rows = min((self._rows_for(self._token_ids(p)) for p in dict.fromkeys(pieces)), key=len)
+        if pieces != [term] and len(rows):
+            rows = rows[np.char.find(self._texts[rows], term) >= 0]
+        return rows
+
+    def matching_rows(self, terms):
+        """Sorted rows whose text contains any of the terms (case-insensitive substring)."""
+        terms = [str(t).lower() for t in terms]
+        if not terms:
+            return np.empty(0, dtype=np.int64)
+        parts = []
+        for t in dict.fromkeys(terms):
+            rows = self._memo.get(t)
+            if rows is None:
+                rows = self._lookup(t)
+                self._memo.put(t, rows)
+            parts.append(rows)
+        return parts[0] if len(parts) == 1 else np.unique(np.concatenate(parts))
+
+    def exclude(self, mask, allergies):
+        """Clear the rows matching any allergy in a boolean mask (in place); returns the mask."""
+        if allergies:
+            rows = self.matching_rows(allergies)
+            # rows past the mask belong to foods still being added
+            mask[rows[rows < len(mask)]] = False
+        return mask
+
+    def search(self, text, limit=None):
+        """Rows whose text contains every word of `text` (food-name search), in catalog order."""
+        words = _TOKEN.findall(str(text).lower())
+        if not words:
+            return np.empty(0, dtype=np.int64)
+        rows = self.matching_rows(words[:1])
+        for w in words[1:]:
+            rows = np.intersect1d(rows, self.matching_rows([w]), assume_unique=True)
+        return rows if limit is None else rows[:limit]
+
+
+def _tokenize(texts, first_row):
+    """Sorted vocabulary of texts plus the (row, vocabulary id) pair of every distinct token per row."""
+    tokens, tok_rows = [], []
+    for row, text in enumerate(texts.tolist(), first_row):
+        toks = set(_TOKEN.findall(text))
+        tokens.extend(toks)
+        tok_rows.extend([row] * len(toks))
+    vocab, tok_ids = np.unique(np.array(tokens, dtype=str), return_inverse=True)
+    return vocab, np.array(tok_rows, dtype=np.int64), tok_ids.astype(np.int64)
+
+
+def _postings(tok_ids, tok_rows, n_tokens):
+    """CSR postings (indptr, rows) from (token id, row) pairs; rows stay ascending within a token."""
+    order = np.argsort(tok_ids, kind='stable')
+    indptr = np.zeros(n_tokens + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tok_ids, minlength=n_tokens), out=indptr[1:])
+    return indptr, tok_rows[order]
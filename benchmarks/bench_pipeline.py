@@ -0,0 +1,167 @@
+# benchmarks/bench_pipeline.py
+# Times each stage of the planning pipeline on synthetic data and writes machine-readable results.
+# Usage (from the repository root):
+#   python benchmarks/bench_pipeline.py --sizes 1000,100000 --output bench.json
+#   python benchmarks/bench_pipeline.py --sizes 1000,100000 --compare bench.json
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+from synthetic import make_catalog, make_profiles, make_history  # noqa: E402
+
+
+def _percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 4)
+
+
+def measure(fn, items, memory_items=20, memory_fn=None):
+    """
+    Call fn(item) for every item and report throughput and latency percentiles.
+    Peak memory is taken in a second, shorter pass under tracemalloc so it does not skew the timings.
+    That pass calls memory_fn (default fn) on the first memory_items items; workloads with side
+    effects pass a memory_fn bound to scratch state, so the measured state is not changed twice.
+    """
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    tracemalloc.start()
+    for item in items[:memory_items]:
+        (memory_fn or fn)(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'calls': len(items),
+        'throughput_per_s': round(len(items) / total, 2) if total > 0 else None,
+        'p50_ms': _percentile_ms(latencies, 50),
+        'p99_ms': _percentile_ms(latencies, 99),
+        'peak_mem_kb': round(peak / 1024, 1),
+    }
+
+
+def bench_catalog_size(n_foods, n_profiles, n_history, tmp, use_cache=False):
+    from planner_core import DietPlanner
+    from history_store import HistoryStore
+    catalog_dir = os.path.join(tmp, f'catalog_{n_foods}')
+    make_catalog(n_foods).save_npy(catalog_dir)
+    history_path = os.path.join(tmp, f'history_{n_foods}.db')
+    with contextlib.redirect_stdout(io.StringIO()):
+        planner = DietPlanner(catalog_dir, history_path=history_path, cache_size=4096 if use_cache else 0)
+    profiles = make_profiles(n_profiles, seed=n_foods)
+    rec = planner.recommender
+    results = {}
+
+    def with_user(fn):
+        def run(user):
+            planner.user_profile = user
+            return fn(user)
+        return run
+
+    results['predict_calories_ml'] = measure(with_user(lambda u: planner.predict_calories_ml()), profiles)
+    results['filter_foods_by_restrictions'] = measure(
+        with_user(lambda u: planner.filter_foods_by_restrictions(planner.food_database)), profiles)
+    results['recommend_candidates'] = measure(
+        lambda u: rec.recommend_candidates(goal=u.goal, top_k=60, dietary_restrictions=u.dietary_restrictions,
+                                           allergies=u.allergies), profiles)
+    candidates = [rec.recommend_candidates(goal=u.goal, top_k=60, dietary_restrictions=u.dietary_restrictions,
+                                           allergies=u.allergies) for u in profiles]
+    targets = [planner.calculate_daily_needs(u)['calories'] / u.meals_per_day for u in profiles]
+    results['assemble_meal_greedy'] = measure(
+        lambda i: rec.assemble_meal_greedy(candidates[i], calorie_target=targets[i], tol=0.25), list(range(len(profiles))))
+    # plan generation without the history write (that is timed separately below)
+    results['generate_meal_plan'] = measure(lambda u: planner.build_meal_plan(u), profiles)
+    results['generate_meal_plan_solver'] = measure(lambda u: planner.build_meal_plan(u, mode='solver'), profiles)
+    batch_start = time.perf_counter()
+    planner.generate_meal_plans(profiles, save_history=False)
+    batch_total = time.perf_counter() - batch_start
+    results['generate_meal_plans_batch'] = {'calls': len(profiles),
+                                            'throughput_per_s': round(len(profiles) / batch_total, 2)}
+
+    entries = make_history(planner.food_database, n_history, seed=n_foods)
+    batches = [entries[i:i + 100] for i in range(0, len(entries), 100)]
+    # the memory pass appends to a scratch store, so every batch lands in the measured store once
+    scratch = HistoryStore(os.path.join(tmp, f'history_{n_foods}_scratch.db'))
+    results['history_append'] = measure(
+        lambda b: planner.history_store.append_many((e['user_id'], e['date'], e['summary']) for e in b), batches,
+        memory_fn=lambda b: scratch.append_many((e['user_id'], e['date'], e['summary']) for e in b))
+    results['history_append']['entries_per_call'] = 100
+    scratch.close()
+    user_ids = sorted({e['user_id'] for e in entries})[:50]
+    results['history_load_recent'] = measure(lambda uid: planner.history_store.recent_entries(uid, 10), user_ids)
+    results['history_scan_totals'] = measure(lambda _: sum(1 for _ in planner.history_store.iter_totals()), [0, 1, 2],
+                                             memory_items=1)
+    results['history_scan_totals']['rows'] = planner.history_store.count()
+    planner.history_store.close()
+    planner.preferences.close()
+    return results
+
+
+def compare(current, baseline):
+    """Print per-stage throughput and p99 ratios against a previous results file."""
+    for size, stages in current['results'].items():
+        base_stages = baseline.get('results', {}).get(size)
+        if not base_stages:
+            continue
+        print(f"\n== {size} foods ==")
+        for stage, cur in stages.items():
+            base = base_stages.get(stage)
+            if not base or not base.get('throughput_per_s') or not cur.get('throughput_per_s'):
+                continue
+            ratio = cur['throughput_per_s'] / base['throughput_per_s']
+            line = f"{stage:32s} throughput x{ratio:6.2f}"
+            if 'p99_ms' in cur and base.get('p99_ms'):
+                line += f"   p99 x{cur['p99_ms'] / base['p99_ms']:6.2f}"
+            print(line + ("   <-- slower" if ratio < 0.9 else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the planning pipeline on synthetic data.")
+    parser.add_argument('--sizes', default='1000,10000,100000', help="comma-separated catalog sizes (up to 1000000)")
+    parser.add_argument('--profiles', type=int, default=200)
+    parser.add_argument('--history', type=int, default=5000, help="history entries to append/load")
+    parser.add_argument('--cache', action='store_true', help="enable the recommendation cache")
+    parser.add_argument('--output', help="write JSON results to this file (default: stdout)")
+    parser.add_argument('--compare', help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    report = {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+              'profiles': args.profiles, 'cache': args.cache, 'results': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        # the planner loads calorie_model.npz / meal_history.csv relative to the repository root
+        os.chdir(REPO_ROOT)
+        try:
+            for size in (int(s) for s in args.sizes.split(',')):
+                print(f"benchmarking {size} foods...", file=sys.stderr)
+                report['results'][str(size)] = bench_catalog_size(size, args.profiles, args.history, tmp, args.cache)
+        finally:
+            os.chdir(cwd)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_startup.py
+# Cold-start benchmark: every sample runs in a fresh Python process, so nothing is cached in memory.
+# Usage (from the repository root):
+#   python benchmarks/bench_startup.py --repeat 5 --output startup.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('tkinter', 'pandas', 'sklearn', 'joblib', 'scipy')
+
+# each scenario is the code timed inside the child process
+SCENARIOS = {
+    'import_planner_core': "import planner_core",
+    'import_gui_module': "import diet_planner_ml",
+    'planner_ready_csv': "import planner_core; planner_core.DietPlanner(history_path={history!r})",
+    'planner_ready_npy': "import planner_core; planner_core.DietPlanner({catalog!r}, history_path={history!r})",
+}
+
+CHILD = """
+import sys, time, json, io, contextlib
+t0 = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    exec({code!r})
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run_once(code):
+    child = CHILD.format(code=code, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, '-c', child], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the planner entry points.")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    with tempfile.TemporaryDirectory() as tmp:
+        # prepare a memory-mappable catalog and an already-migrated history database
+        from food_catalog import FoodCatalog
+        FoodCatalog.load(os.path.join(REPO_ROOT, 'foods.csv')).save_npy(os.path.join(tmp, 'catalog'))
+        history = os.path.join(tmp, 'history.db')
+        run_once(SCENARIOS['planner_ready_csv'].format(history=history))
+
+        results = {}
+        for name, template in SCENARIOS.items():
+            code = template.format(history=history, catalog=os.path.join(tmp, 'catalog'))
+            samples = [run_once(code) for _ in range(args.repeat)]
+            times = [s['seconds'] for s in samples]
+            results[name] = {
+                'median_ms': round(statistics.median(times) * 1000, 2),
+                'min_ms': round(min(times) * 1000, 2),
+                'max_ms': round(max(times) * 1000, 2),
+                'heavy_modules_loaded': samples[-1]['loaded'],
+            }
+
+    report = json.dumps({'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/synthetic.py
+# Synthetic data generators for benchmarks: food catalogs (1k - 1M foods), user profiles, meal histories.
+import numpy as np
+
+# per-category nutrient ranges per 100g: (calories, protein, carbs, fats)
+CATEGORY_RANGES = {
+    'protein': ((50, 300), (8, 35), (0, 10), (0, 20)),
+    'carbs': ((60, 380), (1, 14), (10, 80), (0, 6)),
+    'vegetable': ((10, 80), (0.5, 5), (1, 15), (0, 1.5)),
+    'fruit': ((30, 120), (0.2, 2), (7, 30), (0, 1)),
+    'fats': ((150, 900), (0, 25), (0, 25), (10, 100)),
+    'dairy': ((40, 400), (3, 30), (1, 10), (0, 35)),
+}
+CATEGORY_WEIGHTS = {'protein': 0.22, 'carbs': 0.2, 'vegetable': 0.2, 'fruit': 0.13, 'fats': 0.1, 'dairy': 0.15}
+# probability of each dietary flag given the category
+FLAG_PROBS = {
+    'vegan': {'protein': 0.25, 'carbs': 0.9, 'vegetable': 1.0, 'fruit': 1.0, 'fats': 0.7, 'dairy': 0.0},
+    'vegetarian': {'protein': 0.45, 'carbs': 0.95, 'vegetable': 1.0, 'fruit': 1.0, 'fats': 0.85, 'dairy': 1.0},
+    'gluten-free': {'protein': 0.85, 'carbs': 0.5, 'vegetable': 1.0, 'fruit': 1.0, 'fats': 0.95, 'dairy': 0.9},
+    'pescatarian': {'protein': 0.3, 'carbs': 0.0, 'vegetable': 0.0, 'fruit': 0.0, 'fats': 0.05, 'dairy': 0.0},
+    'low-carb': {'protein': 0.8, 'carbs': 0.0, 'vegetable': 0.5, 'fruit': 0.05, 'fats': 0.7, 'dairy': 0.5},
+    'low-fat': {'protein': 0.4, 'carbs': 0.7, 'vegetable': 0.9, 'fruit': 0.9, 'fats': 0.0, 'dairy': 0.3},
+    'fiber-rich': {'protein': 0.1, 'carbs': 0.4, 'vegetable': 0.6, 'fruit': 0.5, 'fats': 0.2, 'dairy': 0.0},
+    'omega-3': {'protein': 0.15, 'carbs': 0.0, 'vegetable': 0.02, 'fruit': 0.0, 'fats': 0.2, 'dairy': 0.0},
+}
+NAME_WORDS = ['Peanut', 'Wheat', 'Soy', 'Milk', 'Egg', 'Almond', 'Oat', 'Rice', 'Chicken', 'Beef', 'Salmon',
+              'Tuna', 'Lentil', 'Bean', 'Corn', 'Apple', 'Berry', 'Cashew', 'Sesame', 'Coconut', 'Pea', 'Spinach']
+
+
+def make_catalog(n_foods, seed=0):
+    """FoodCatalog with n_foods synthetic items (realistic category-dependent nutrients and flags)."""
+    from food_catalog import FoodCatalog
+    rng = np.random.default_rng(seed)
+    cats = np.array(list(CATEGORY_WEIGHTS))
+    cat_idx = rng.choice(len(cats), size=n_foods, p=list(CATEGORY_WEIGHTS.values()))
+    columns = {}
+    for j, col in enumerate(('calories', 'protein', 'carbs', 'fats')):
+        lo = np.array([CATEGORY_RANGES[c][j][0] for c in cats])[cat_idx]
+        hi = np.array([CATEGORY_RANGES[c][j][1] for c in cats])[cat_idx]
+        columns[col] = np.round(rng.uniform(lo, hi), 1)
+    flag_cols = []
+    for flag, probs in FLAG_PROBS.items():
+        p = np.array([probs[c] for c in cats])[cat_idx]
+        flag_cols.append((flag, rng.random(n_foods) < p))
+    # vegan foods are also vegetarian
+    has = dict(flag_cols)
+    has['vegetarian'] |= has['vegan']
+    words = np.array(NAME_WORDS)
+    w1 = words[rng.integers(len(words), size=n_foods)]
+    w2 = words[rng.integers(len(words), size=n_foods)]
+    columns['name'] = np.array([f"{a} {b} {c} #{i}" for i, (a, b, c) in enumerate(zip(w1, w2, cats[cat_idx]))])
+    columns['category'] = cats[cat_idx]
+    columns['portion'] = np.where(np.isin(columns['category'], ['carbs']), '100g cooked', '100g')
+    flag_names = list(has)
+    flag_matrix = np.column_stack([has[f] for f in flag_names])
+    columns['dietary_flags'] = np.array([','.join(f for f, on in zip(flag_names, row) if on) for row in flag_matrix])
+    return FoodCatalog(columns)
+
+
+def make_profiles(n_profiles, n_users=None, seed=0):
+    """List of UserProfile objects with plausible body data, goals, restrictions and allergies."""
+    from planner_core import UserProfile
+    rng = np.random.default_rng(seed)
+    n_users = n_users or n_profiles
+    restriction_choices = [[], [], [], ['vegetarian'], ['vegan'], ['gluten-free'], ['vegan', 'gluten-free']]
+    allergy_choices = [[], [], [], [], ['peanut'], ['milk'], ['soy', 'wheat']]
+    profiles = []
+    for i in range(n_profiles):
+        u = UserProfile()
+        u.user_id = f"user{rng.integers(n_users)}"
+        male = rng.random() < 0.5
+        u.gender = 'Male' if male else 'Female'
+        u.age = int(rng.integers(18, 75))
+        u.height = float(np.round(rng.normal(177 if male else 164, 7), 1))
+        u.weight = float(np.round(rng.normal(82 if male else 68, 12), 1))
+        u.activity_level = str(rng.choice(['sedentary', 'light', 'moderate', 'very_active', 'extra_active']))
+        u.goal = str(rng.choice(['lose', 'maintain', 'gain']))
+        u.dietary_restrictions = list(restriction_choices[rng.integers(len(restriction_choices))])
+        u.allergies = list(allergy_choices[rng.integers(len(allergy_choices))])
+        u.meals_per_day = int(rng.integers(2, 6))
+        profiles.append(u)
+    return profiles
+
+
+def make_history(catalog, n_entries, n_users=100, start='2024-01-01', days=365, seed=0):
+    """List of history entries {"date", "user_id", "summary"} in the planner's summary format."""
+    rng = np.random.default_rng(seed)
+    dates = np.datetime64(start) + rng.integers(days, size=n_entries).astype('timedelta64[D]')
+    dates.sort()
+    n = len(catalog)
+    cols = catalog.columns
+    entries = []
+    for e in range(n_entries):
+        meals = []
+        totals = dict(calories=0.0, protein=0.0, carbs=0.0, fats=0.0)
+        for m in range(int(rng.integers(2, 5))):
+            rows = rng.integers(n, size=int(rng.integers(2, 6)))
+            nutrition = {k: float(np.asarray(cols[k])[rows].sum()) for k in totals}
+            for k in totals:
+                totals[k] += nutrition[k]
+            meals.append({"meal_number": m + 1,
+                          "foods": [{"name": str(cols['name'][r]), "portion": str(cols['portion'][r])} for r in rows],
+                          "nutrition": {k: round(v) for k, v in nutrition.items()}})
+        entries.append({"date": str(dates[e]), "user_id": f"user{rng.integers(n_users)}",
+                        "summary": {"total_nutrition": {k: round(v) for k, v in totals.items()}, "meals": meals}})
+    return entries
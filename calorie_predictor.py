@@ -0,0 +1,168 @@
+# calorie_predictor.py
+import json
+import os
+import numpy as np
+from instrumentation import metrics
+
+# feature order the calorie model was trained on (see train_calorie_model.py)
+FEATURES = ('age', 'weight', 'height', 'activity_level', 'goal')
+
+# goal -> model code (0=lose, 1=maintain, 2=gain); unknown goals count as maintain
+GOAL_CODES = {"lose": 0, "maintain": 1, "gain": 2}
+# activity level -> multiplier fed to the ML model (unknown -> 1.5)
+ML_ACTIVITY = {
+    "sedentary": 1.2, "light": 1.375, "moderate": 1.55, "very active": 1.725, "very_active": 1.725,
+    "extra active": 1.9, "extra_active": 1.9
+}
+ML_ACTIVITY_DEFAULT = 1.5
+# Harris-Benedict activity multipliers (unknown -> 1.2) and goal calorie adjustments
+HB_ACTIVITY = {"sedentary": 1.2, "light": 1.375, "moderate": 1.55, "very_active": 1.725, "extra_active": 1.9}
+HB_ACTIVITY_DEFAULT = 1.2
+GOAL_ADJUSTMENTS = {"lose": -500, "maintain": 0, "gain": 500}
+# versioned models published by calorie_training.py: <MODEL_DIR>/v0001/{model.npz,meta.json}, LATEST -> name
+MODEL_DIR = os.path.join('models', 'calorie')
+
+
+def _lookup(values, table, default, lower=False):
+    """Map an array of labels through `table`; numeric arrays are returned unchanged (already encoded)."""
+    arr = np.asarray(values)
+    if arr.dtype.kind in 'biuf':
+        return arr.astype(float)
+    # only the distinct labels go through the dict; the result is scattered back with one take
+    labels, inverse = np.unique(arr.astype(str).ravel(), return_inverse=True)
+    if lower:
+        mapped = [table.get(v.lower(), default) for v in labels.tolist()]
+    else:
+        mapped = [table.get(v, default) for v in labels.tolist()]
+    return np.asarray(mapped, dtype=float)[inverse.reshape(-1)].reshape(arr.shape)
+
+
+def encode_goals(goals):
+    return _lookup(goals, GOAL_CODES, 1)
+
+
+def encode_activity(levels):
+    """Activity multipliers as used by the ML model."""
+    return _lookup(levels, ML_ACTIVITY, ML_ACTIVITY_DEFAULT, lower=True)
+
+
+def harris_benedict_batch(age, weight, height, male, activity, goal):
+    """
+    Vectorized Harris-Benedict fallback.
+    male: boolean array; activity: labels (or multipliers); goal: labels (or calorie adjustments).
+    Returns unrounded daily calories.
+    """
+    age, weight, height = (np.asarray(a, dtype=float) for a in (age, weight, height))
+    male = np.asarray(male, dtype=bool)
+    bmr = np.where(male,
+                   88.362 + 13.397 * weight + 4.799 * height - 5.677 * age,
+                   447.593 + 9.247 * weight + 3.098 * height - 4.330 * age)
+    tdee = bmr * _lookup(activity, HB_ACTIVITY, HB_ACTIVITY_DEFAULT)
+    return tdee + _lookup(goal, GOAL_ADJUSTMENTS, 0)
+
+
+class LinearCalorieRuntime:
+    """
+    The fitted linear calorie model reduced to its coefficients: predict is one dot product,
+    so serving processes need neither scikit-learn nor joblib. Stored as a small .npz file.
+    """
+
+    def __init__(self, coef, intercept, features=FEATURES):
+        self.coef = np.asarray(coef, dtype=float).reshape(-1)
+        self.intercept = float(intercept)
+        self.features = tuple(features)
+
+    @classmethod
+    def from_model(cls, model):
+        return cls(model.coef_, model.intercept_)
+
+    @classmethod
+    def load(cls, path='calorie_model.npz'):
+        with np.load(path) as data:
+            return cls(data['coef'], data['intercept'], tuple(str(f) for f in data['features']))
+
+    def save(self, path='calorie_model.npz'):
+        np.savez(path, coef=self.coef, intercept=np.array(self.intercept), features=np.array(self.features))
+
+    def predict(self, X):
+        return np.asarray(X, dtype=float) @ self.coef + self.intercept
+
+
+def load_calorie_model(npz_path='calorie_model.npz', pkl_path='calorie_model.pkl'):
+    """
+    Prefer the lightweight .npz runtime; otherwise unpickle the sklearn model with joblib and,
+    when it is linear, reduce it to a runtime. Returns None if neither file can be loaded.
+    """
+    if npz_path and os.path.exists(npz_path):
+        try:
+            model = LinearCalorieRuntime.load(npz_path)
+            print("Loaded", npz_path)
+            return model
+        except Exception as e:
+            print("Failed to load", npz_path, "Error:", e)
+            metrics.incr("model_load_failure")
+    try:
+        import joblib
+        model = joblib.load(pkl_path)
+        print("Loaded", pkl_path)
+    except Exception as e:
+        print("No calorie_model.pkl found, falling back to Harris-Benedict. Error:", e)
+        metrics.incr("model_load_failure")
+        return None
+    if hasattr(model, 'coef_') and hasattr(model, 'intercept_'):
+        return LinearCalorieRuntime.from_model(model)
+    return model
+
+
+def latest_model_version(model_dir=MODEL_DIR):
+    """Name of the version LATEST points at, or None when nothing has been published."""
+    try:
+        with open(os.path.join(model_dir, 'LATEST')) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def load_model_version(model_dir=MODEL_DIR, version=None):
+    """Load a published version (default: LATEST). Returns (runtime, meta dict)."""
+    version = version or latest_model_version(model_dir)
+    if version is None:
+        raise FileNotFoundError(f"no calorie model published in {model_dir}")
+    path = os.path.join(model_dir, version)
+    runtime = LinearCalorieRuntime.load(os.path.join(path, 'model.npz'))
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    return runtime, meta
+
+
+def predict_calories_batch(model, age, weight, height, activity, goal, male=None):
+    """
+    Daily calories for many profiles in one pass (rounded, float array).
+    activity/goal may be labels or already-encoded numbers. Uses the ML model when given and
+    falls back to Harris-Benedict (which needs `male`) when there is no model or it fails.
+    """
+    age, weight, height = (np.asarray(a, dtype=float) for a in (age, weight, height))
+    if model is not None:
+        X = np.column_stack([age, weight, height, encode_activity(activity), encode_goals(goal)])
+        try:
+            with metrics.timer("model_prediction"):
+                return np.round(np.asarray(model.predict(X), dtype=float))
+        except Exception as e:
+            print("Calorie model predict failed, falling back. Error:", e)
+            metrics.incr("model_failure")
+    if male is None:
+        male = np.zeros(age.shape, dtype=bool)
+    metrics.incr("harris_benedict_fallback", int(age.size))
+    with metrics.timer("harris_benedict"):
+        return np.round(harris_benedict_batch(age, weight, height, male, activity, goal))
+
+
+def export_runtime(pkl_path='calorie_model.pkl', npz_path='calorie_model.npz'):
+    """Convert a pickled LinearRegression into the .npz runtime."""
+    import joblib
+    LinearCalorieRuntime.from_model(joblib.load(pkl_path)).save(npz_path)
+    print("Exported", pkl_path, "->", npz_path)
+
+
+if __name__ == "__main__":
+    export_runtime()
@@ -0,0 +1,244 @@
+# calorie_training.py
+# Out-of-core training pipeline for the calorie model.
+#   python calorie_training.py profiles_*.csv --model-dir models/calorie --checkpoint train.ckpt.npz
+# Input files (CSV, or Parquet when pyarrow is installed) are streamed in chunks; every chunk updates the
+# model's sufficient statistics, so memory stays O(features^2) whatever the data size. Progress is
+# checkpointed and an interrupted run resumes where it stopped. Each run publishes a new version
+# directory (model.npz + meta.json) under --model-dir and points models/calorie/LATEST at it; running
+# planners pick it up without a restart (see DietPlanner.reload_calorie_model).
+import argparse
+import json
+import os
+import time
+import numpy as np
+from calorie_predictor import (FEATURES, LinearCalorieRuntime, encode_activity, encode_goals,
+                               MODEL_DIR, latest_model_version)
+
+TARGET = 'calories'
+# how each feature column is turned into a number (recorded in meta.json)
+FEATURE_SCHEMA = [
+    {'name': 'age', 'dtype': 'float', 'encoding': 'raw'},
+    {'name': 'weight', 'dtype': 'float', 'encoding': 'raw', 'unit': 'kg'},
+    {'name': 'height', 'dtype': 'float', 'encoding': 'raw', 'unit': 'cm'},
+    {'name': 'activity_level', 'dtype': 'float', 'encoding': 'calorie_predictor.ML_ACTIVITY (labels or multipliers)'},
+    {'name': 'goal', 'dtype': 'float', 'encoding': 'calorie_predictor.GOAL_CODES (labels or 0/1/2)'},
+]
+
+
+class StreamingLinearRegression:
+    """
+    Least-squares linear regression learned incrementally: partial_fit only accumulates X'X, X'y and
+    y'y (with an intercept column), so the fit equals LinearRegression on all rows seen so far and
+    the state is a few small arrays that can be checkpointed or merged.
+    """
+
+    def __init__(self, n_features, alpha=0.0):
+        self.n_features = n_features
+        self.alpha = alpha
+        self.xtx = np.zeros((n_features + 1, n_features + 1))
+        self.xty = np.zeros(n_features + 1)
+        self.yty = 0.0
+        self.y_sum = 0.0
+        self.n = 0
+
+    def partial_fit(self, X, y):
+        X1 = np.column_stack([np.asarray(X, dtype=float), np.ones(len(X))])
+        y = np.asarray(y, dtype=float)
+        self.xtx += X1.T @ X1
+        self.xty += X1.T @ y
+        self.yty += float(y @ y)
+        self.y_sum += float(y.sum())
+        self.n += len(y)
+        return self
+
+    def solve(self):
+        """(coef, intercept) of the current fit; alpha adds ridge regularization (intercept excluded)."""
+        A = self.xtx.copy()
+        A[np.arange(self.n_features), np.arange(self.n_features)] += self.alpha
+        w = np.linalg.lstsq(A, self.xty, rcond=None)[0]
+        return w[:-1], float(w[-1])
+
+    def score(self, coef, intercept):
+        """RMSE and R^2 of a linear model on the rows accumulated here (no second pass over the data)."""
+        if self.n == 0:
+            return {'rmse': None, 'r2': None}
+        w = np.append(coef, intercept)
+        sse = max(self.yty - 2 * float(w @ self.xty) + float(w @ self.xtx @ w), 0.0)
+        sst = self.yty - self.y_sum ** 2 / self.n
+        return {'rmse': round(float(np.sqrt(sse / self.n)), 3),
+                'r2': round(1 - sse / sst, 5) if sst > 0 else None}
+
+    def state(self, prefix):
+        return {prefix + 'xtx': self.xtx, prefix + 'xty': self.xty,
+                prefix + 'scalars': np.array([self.yty, self.y_sum, self.n])}
+
+    def load_state(self, data, prefix):
+        self.xtx = np.array(data[prefix + 'xtx'])
+        self.xty = np.array(data[prefix + 'xty'])
+        self.yty, self.y_sum, n = (float(v) for v in data[prefix + 'scalars'])
+        self.n = int(n)
+
+
+def iter_chunks(path, chunksize=100_000, skip_rows=0):
+    """Yield DataFrames of up to chunksize rows from a CSV or Parquet file, starting after skip_rows rows."""
+    if path.endswith('.parquet') or path.endswith('.pq'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("reading Parquet needs pyarrow (pip install pyarrow)")
+        seen = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=list(FEATURES) + [TARGET]):
+            df = batch.to_pandas()
+            if seen + len(df) > skip_rows:
+                yield df.iloc[max(0, skip_rows - seen):]
+            seen += len(df)
+        return
+    import pandas as pd
+    # skip data rows but keep the header line
+    skip = range(1, skip_rows + 1) if skip_rows else None
+    yield from pd.read_csv(path, chunksize=chunksize, skiprows=skip, usecols=list(FEATURES) + [TARGET])
+
+
+def encode_chunk(df):
+    """Feature matrix and target for one chunk; rows with missing values are dropped."""
+    df = df.dropna(subset=list(FEATURES) + [TARGET])
+    X = np.column_stack([df['age'].to_numpy(float), df['weight'].to_numpy(float), df['height'].to_numpy(float),
+                         encode_activity(df['activity_level'].to_numpy()), encode_goals(df['goal'].to_numpy())])
+    return X, df[TARGET].to_numpy(float)
+
+
+class Trainer:
+    """
+    Streams one or more files into a training and a holdout accumulator. Every holdout_every-th row
+    (by position in the input, so the split is the same after a resume) is held out for metrics.
+    """
+
+    def __init__(self, sources, alpha=0.0, holdout_every=10):
+        self.sources = list(sources)
+        self.holdout_every = holdout_every
+        self.train = StreamingLinearRegression(len(FEATURES), alpha)
+        self.holdout = StreamingLinearRegression(len(FEATURES), alpha)
+        # position in the input: current file and rows already consumed from it
+        self.source_index = 0
+        self.source_rows = 0
+        self.rows_seen = 0
+        self.rows_dropped = 0
+
+    def save_checkpoint(self, path):
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, sources=np.array(self.sources), alpha=np.array(self.train.alpha),
+                 position=np.array([self.source_index, self.source_rows, self.rows_seen, self.rows_dropped,
+                                    self.holdout_every]),
+                 **self.train.state('train_'), **self.holdout.state('holdout_'))
+        os.replace(tmp, path)
+
+    def load_checkpoint(self, path):
+        """Resume from a checkpoint written for the same input files; returns False if it does not match."""
+        with np.load(path) as data:
+            if [str(s) for s in data['sources']] != self.sources or float(data['alpha']) != self.train.alpha:
+                return False
+            self.source_index, self.source_rows, self.rows_seen, self.rows_dropped, self.holdout_every = (
+                int(v) for v in data['position'])
+            self.train.load_state(data, 'train_')
+            self.holdout.load_state(data, 'holdout_')
+        return True
+
+    def run(self, chunksize=100_000, checkpoint=None, checkpoint_every=10):
+        chunks_since_checkpoint = 0
+        while self.source_index < len(self.sources):
+            path = self.sources[self.source_index]
+            for df in iter_chunks(path, chunksize, skip_rows=self.source_rows):
+                held = (np.arange(self.rows_seen, self.rows_seen + len(df)) % self.holdout_every) == 0
+                X, y = encode_chunk(df[~held])
+                self.train.partial_fit(X, y)
+                Xh, yh = encode_chunk(df[held])
+                self.holdout.partial_fit(Xh, yh)
+                self.rows_dropped += len(df) - len(y) - len(yh)
+                self.source_rows += len(df)
+                self.rows_seen += len(df)
+                chunks_since_checkpoint += 1
+                if checkpoint and chunks_since_checkpoint >= checkpoint_every:
+                    self.save_checkpoint(checkpoint)
+                    chunks_since_checkpoint = 0
+            self.source_index += 1
+            self.source_rows = 0
+            if checkpoint:
+                self.save_checkpoint(checkpoint)
+
+    def metrics(self, coef, intercept):
+        train, holdout = self.train.score(coef, intercept), self.holdout.score(coef, intercept)
+        return {'train_rmse': train['rmse'], 'train_r2': train['r2'],
+                'holdout_rmse': holdout['rmse'], 'holdout_r2': holdout['r2'],
+                'n_train': self.train.n, 'n_holdout': self.holdout.n, 'rows_dropped': self.rows_dropped}
+
+
+def publish(runtime, meta, model_dir=MODEL_DIR):
+    """
+    Write runtime + meta.json as the next version under model_dir (v0001, v0002, ...) and point
+    LATEST at it. The version directory is complete before LATEST changes, so readers never see
+    a partial model. Returns the version name.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    existing = [int(d[1:]) for d in os.listdir(model_dir) if d.startswith('v') and d[1:].isdigit()]
+    version = f"v{max(existing, default=0) + 1:04d}"
+    tmp_dir = os.path.join(model_dir, '.tmp-' + version)
+    os.makedirs(tmp_dir)
+    runtime.save(os.path.join(tmp_dir, 'model.npz'))
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(dict(meta, version=version), f, indent=2)
+    os.rename(tmp_dir, os.path.join(model_dir, version))
+    latest_tmp = os.path.join(model_dir, 'LATEST.tmp')
+    with open(latest_tmp, 'w') as f:
+        f.write(version + '\n')
+    os.replace(latest_tmp, os.path.join(model_dir, 'LATEST'))
+    return version
+
+
+def train(sources, model_dir=MODEL_DIR, checkpoint=None, chunksize=100_000, alpha=0.0, holdout_every=10,
+          checkpoint_every=10):
+    """Stream `sources`, fit the linear calorie model and publish it as a new version. Returns the version."""
+    started = time.time()
+    trainer = Trainer(sources, alpha=alpha, holdout_every=holdout_every)
+    if checkpoint and os.path.exists(checkpoint):
+        if trainer.load_checkpoint(checkpoint):
+            print(f"Resuming from {checkpoint} at row {trainer.rows_seen}")
+        else:
+            print(f"Checkpoint {checkpoint} is for different inputs, starting over")
+    trainer.run(chunksize=chunksize, checkpoint=checkpoint, checkpoint_every=checkpoint_every)
+    if trainer.train.n == 0:
+        raise ValueError("no usable training rows in " + ", ".join(sources))
+    coef, intercept = trainer.train.solve()
+    meta = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'model': 'linear', 'alpha': alpha,
+        'features': FEATURE_SCHEMA, 'target': TARGET,
+        'sources': [os.path.abspath(s) for s in sources],
+        'rows': trainer.rows_seen, 'holdout_every': holdout_every,
+        'metrics': trainer.metrics(coef, intercept),
+        'parent_version': latest_model_version(model_dir),
+        'train_seconds': round(time.time() - started, 2),
+    }
+    version = publish(LinearCalorieRuntime(coef, intercept), meta, model_dir)
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    print(f"Published calorie model {version} to {model_dir}: {meta['metrics']}")
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the calorie model on CSV/Parquet files out of core.")
+    parser.add_argument('sources', nargs='+', help="CSV or Parquet files with age, weight, height, "
+                                                   "activity_level, goal and calories columns")
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--checkpoint', help="checkpoint file; an existing one for the same inputs is resumed")
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--checkpoint-every', type=int, default=10, help="chunks between checkpoints")
+    parser.add_argument('--alpha', type=float, default=0.0, help="ridge regularization strength")
+    parser.add_argument('--holdout-every', type=int, default=10, help="hold out every n-th row for metrics")
+    args = parser.parse_args()
+    train(args.sources, args.model_dir, args.checkpoint, args.chunksize, args.alpha, args.holdout_every,
+          args.checkpoint_every)
+
+
+if __name__ == "__main__":
+    main()
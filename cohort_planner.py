@@ -0,0 +1,150 @@
+# cohort_planner.py
+# Multi-process planning for large cohorts.
+#   python cohort_planner.py profiles.jsonl --workers 8 --chunk-size 500
+# profiles.jsonl holds one UserProfile dict per line (see UserProfile.to_dict).
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from itertools import islice
+from multiprocessing import shared_memory
+import numpy as np
+from food_catalog import FoodCatalog
+from planner_core import DietPlanner, UserProfile
+
+# per-worker state, set by _init_worker
+_worker = {}
+
+
+class SharedArrays:
+    """
+    Publishes NumPy arrays once through multiprocessing.shared_memory. The parent owns the blocks
+    (close + unlink when done); workers attach by name and map them without copying.
+    """
+
+    def __init__(self, arrays):
+        self._blocks = []
+        self.spec = {}
+        for key, arr in arrays.items():
+            arr = np.ascontiguousarray(arr)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+            self._blocks.append(shm)
+            self.spec[key] = (shm.name, arr.shape, arr.dtype.str)
+
+    @staticmethod
+    def attach(spec):
+        """Map the published arrays in this process. Returns (arrays dict, blocks to keep alive)."""
+        arrays, blocks = {}, []
+        for key, (name, shape, dtype) in spec.items():
+            shm = shared_memory.SharedMemory(name=name)
+            arr = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+            arr.flags.writeable = False
+            arrays[key] = arr
+            blocks.append(shm)
+        return arrays, blocks
+
+    def close(self):
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+
+
+def _publish(planner: DietPlanner):
+    """Put the catalog columns and the recommender's prepared arrays into shared memory."""
+    rec_arrays, rec_meta = planner.recommender.shared_state()
+    arrays = {'catalog.' + c: np.asarray(col) for c, col in planner.food_database.columns.items()}
+    arrays.update({'rec.' + k: v for k, v in rec_arrays.items()})
+    return SharedArrays(arrays), rec_meta
+
+
+def _init_worker(spec, rec_meta, calorie_model):
+    from recommender import SimpleRecommender
+    arrays, blocks = SharedArrays.attach(spec)
+    catalog = FoodCatalog({k[len('catalog.'):]: v for k, v in arrays.items() if k.startswith('catalog.')})
+    rec = SimpleRecommender.from_state(catalog, {k[len('rec.'):]: v for k, v in arrays.items() if k.startswith('rec.')}, rec_meta)
+    _worker['blocks'] = blocks
+    _worker['planner'] = DietPlanner.from_components(catalog, rec, calorie_model)
+
+
+def _plan_chunk(profile_dicts, pref_vecs):
+    """Worker task: plan one chunk with the batch API and return history entries (no writes here)."""
+    planner = _worker['planner']
+    profiles = [UserProfile.from_dict(d) for d in profile_dicts]
+    plans = planner.generate_meal_plans(profiles, save_history=False, pref_vecs=pref_vecs)
+    return [planner.history_entry(plan, user) for user, plan in zip(profiles, plans)]
+
+
+def _chunks(profiles, chunk_size):
+    it = iter(profiles)
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        yield [p.to_dict() if isinstance(p, UserProfile) else dict(p) for p in chunk]
+
+
+def plan_cohort(profiles, planner: DietPlanner = None, workers=None, chunk_size=500,
+                max_in_flight=None, save_history=True):
+    """
+    Plan a stream of profiles (UserProfile objects or dicts) across a process pool.
+    The catalog and normalized features are published once via shared memory, so each worker
+    only maps them; profiles are sent in chunks with at most `max_in_flight` chunks outstanding,
+    and results are yielded (and written to the history store) in input order.
+    Yields one history entry {"date", "user_id", "summary"} per profile.
+    """
+    planner = planner or DietPlanner()
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    shared, rec_meta = _publish(planner)
+    try:
+        with mp.Pool(workers, initializer=_init_worker, initargs=(shared.spec, rec_meta, planner.calorie_model)) as pool:
+            pending = deque()
+            chunks = _chunks(profiles, chunk_size)
+            for chunk in chunks:
+                # preference vectors are looked up in the parent so workers stay stateless
+                pref_vecs = [planner._preference_vector(UserProfile.from_dict(d)) for d in chunk]
+                pending.append(pool.apply_async(_plan_chunk, (chunk, pref_vecs)))
+                if len(pending) >= max_in_flight:
+                    yield from _drain_one(planner, pending, save_history)
+            while pending:
+                yield from _drain_one(planner, pending, save_history)
+    finally:
+        shared.close()
+
+
+def _drain_one(planner, pending, save_history):
+    entries = pending.popleft().get()
+    if save_history:
+        planner.write_history_entries(entries)
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan a cohort of profiles across all cores.")
+    parser.add_argument('profiles', help="JSON-lines file with one profile per line")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--no-history', action='store_true', help="do not write plans to the history store")
+    args = parser.parse_args()
+
+    def read_profiles():
+        with open(args.profiles) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    start = time.perf_counter()
+    n = 0
+    for _ in plan_cohort(read_profiles(), workers=args.workers, chunk_size=args.chunk_size,
+                         save_history=not args.no_history):
+        n += 1
+    elapsed = time.perf_counter() - start
+    print(f"Planned {n} profiles in {elapsed:.2f}s ({n / max(elapsed, 1e-9):.0f} profiles/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# collab_filter.py
+# Implicit-feedback collaborative filtering over the meal history (which users were given which foods).
+#   cf = CollaborativeFilter.from_history(planner.history_store, catalog.index_of, n_items=len(catalog))
+#   planner.recommender.set_collaborative(cf, weight=0.3)   # blended into recommend_candidates
+#   cf.add_plans([(user_id, [row, row, ...])])               # fold in a saved plan
+import threading
+import numpy as np
+
+
+def _csr(user_rows, item_rows, counts, n_rows):
+    """Sort COO triplets into CSR arrays (indptr, indices, data) with n_rows rows."""
+    order = np.argsort(user_rows, kind='stable')
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(user_rows, minlength=n_rows), out=indptr[1:])
+    return indptr, item_rows[order], counts[order]
+
+
+class CollaborativeFilter:
+    """
+    Implicit ALS (Hu, Koren & Volinsky): the user-by-food count matrix R is factored into user and
+    food factors so that u . y approximates 1 where R > 0, with confidence 1 + alpha * R.
+    - interactions are kept sparse, one {food row: count} dict per user;
+    - fit() alternates exact least-squares solves for all users and all foods; each side is solved
+      in chunks as stacked (f x f) systems, using YtY + Y_u^T (C_u - I) Y_u so a row costs O(nnz f^2);
+    - add_plans() folds a saved plan into the user's counts and re-solves only that user's factors
+      against the fixed food factors; foods are refreshed by the next fit(), which is due once the plans
+      folded in since the last fit reach max(refit_every, refit_growth * plans that fit saw), so refits
+      get rarer as the history grows. A due refit runs on a background thread (background_refit=False
+      leaves it to the caller: check refit_due and call fit() from a scheduled job);
+    - fit() solves without holding the lock and swaps the new factors in at the end, so saves and
+      scoring carry on against the old factors meanwhile;
+    - scores() only touches the factor rows of the foods asked for, so blending into a candidate
+      pool costs O(pool * factors) whatever the catalog or user count.
+    """
+
+    def __init__(self, n_items, factors=16, reg=0.1, alpha=10.0, iterations=8, refit_every=1000,
+                 refit_growth=0.25, background_refit=True, seed=0):
+        self.factors = factors
+        self.reg = reg
+        self.alpha = alpha
+        self.iterations = iterations
+        self.refit_every = refit_every
+        self.refit_growth = refit_growth
+        self.background_refit = background_refit
+        self._rng = np.random.default_rng(seed)
+        # _lock guards the interaction rows and the factors; _fit_lock lets one fit() run at a time
+        self._lock = threading.Lock()
+        self._fit_lock = threading.Lock()
+        self._refit_thread = None
+        self.user_index = {}
+        self._rows = []
+        self.user_factors = np.zeros((0, factors))
+        self.item_factors = self._rng.normal(scale=0.01, size=(n_items, factors))
+        self._YtY = None
+        # fit_version counts full fits; user_updates counts fold-ins per user (both go into cache keys)
+        self.fit_version = 0
+        self.user_updates = {}
+        # plans the last fit saw, plans folded in since, and rows folded in while a fit is running
+        self._n_plans = 0
+        self._pending = 0
+        self._touched = None
+
+    @classmethod
+    def from_history(cls, history_store, index_of, n_items, **params):
+        """Build and fit from every plan in a HistoryStore; index_of(name) maps food names to catalog rows."""
+        cf = cls(n_items, **params)
+        for user_ids, names, counts in history_store.iter_food_counts():
+            for user_id, name, count in zip(user_ids, names, counts):
+                item = index_of(name)
+                if item is not None:
+                    row = cf._user_row(user_id)
+                    cf._rows[row][item] = cf._rows[row].get(item, 0) + count
+        cf._n_plans = history_store.count()
+        if cf.user_index:
+            cf.fit()
+        return cf
+
+    @property
+    def fitted(self):
+        return self._YtY is not None
+
+    def __contains__(self, user_id):
+        return user_id in self.user_index
+
+    def _user_row(self, user_id):
+        row = self.user_index.get(user_id)
+        if row is None:
+            row = self.user_index[user_id] = len(self._rows)
+            self._rows.append({})
+        return row
+
+    def ensure_items(self, n_items):
+        """Grow the food factors for foods added to the catalog (they score 0 until the next fit)."""
+        with self._lock:
+            extra = n_items - len(self.item_factors)
+            if extra > 0:
+                self.item_factors = np.vstack([self.item_factors, np.zeros((extra, self.factors))])
+
+    # ----- training -----
+
+    def _solve_side(self, indptr, indices, data, Y, max_nnz=20_000):
+        """
+        Least-squares factors for every CSR row against fixed factors Y, in chunks of about max_nnz entries.
+        Rows without interactions solve to zero and are skipped, so a chunk allocates one (f x f) system
+        per non-empty row only (at most max_nnz of them) however many empty rows it spans.
+        """
+        n_rows, f = len(indptr) - 1, Y.shape[1]
+        YtY = Y.T @ Y
+        base = YtY + self.reg * np.eye(f)
+        out = np.zeros((n_rows, f))
+        start = 0
+        while start < n_rows:
+            stop = max(start + 1, int(np.searchsorted(indptr, indptr[start] + max_nnz, side='right')) - 1)
+            stop = min(stop, n_rows)
+            lo, hi = indptr[start], indptr[stop]
+            if hi > lo:
+                nonempty = np.flatnonzero(np.diff(indptr[start:stop + 1]))
+                offsets = indptr[start:stop][nonempty] - lo
+                Yi = Y[indices[lo:hi]]
+                conf = 1 + self.alpha * data[lo:hi]
+                A = base + np.add.reduceat((conf - 1)[:, None, None] * Yi[:, :, None] * Yi[:, None, :],
+                                           offsets, axis=0)
+                b = np.add.reduceat(conf[:, None] * Yi, offsets, axis=0)
+                out[start + nonempty] = np.linalg.solve(A, b[:, :, None])[:, :, 0]
+            start = stop
+        return out
+
+    def fit(self, iterations=None):
+        """
+        Full ALS over all interactions recorded so far. Only the snapshot of the counts is taken under
+        the lock; the solves run without it and the new factors are swapped in at the end, after which
+        users whose plans were folded in during the fit are re-solved against the new food factors.
+        """
+        with self._fit_lock:
+            with self._lock:
+                n_users, n_items = len(self._rows), len(self.item_factors)
+                counts = [len(r) for r in self._rows]
+                user_rows = np.repeat(np.arange(n_users), counts)
+                item_rows = np.fromiter((i for r in self._rows for i in r), dtype=np.int64, count=sum(counts))
+                data = np.fromiter((c for r in self._rows for c in r.values()), dtype=float, count=sum(counts))
+                Y = self.item_factors
+                pending = self._pending
+                self._touched = set()
+            by_user = _csr(user_rows, item_rows, data, n_users)
+            by_item = _csr(item_rows, user_rows, data, n_items)
+            for _ in range(iterations or self.iterations):
+                X = self._solve_side(*by_user, Y)
+                Y = self._solve_side(*by_item, X)
+            X = self._solve_side(*by_user, Y)
+            with self._lock:
+                # foods / users added during the fit get zero rows until they are folded in or refit
+                extra = len(self.item_factors) - len(Y)
+                if extra > 0:
+                    Y = np.vstack([Y, np.zeros((extra, self.factors))])
+                U = np.zeros((max(len(self.user_factors), n_users), self.factors))
+                U[:n_users] = X
+                self.user_factors, self.item_factors, self._YtY = U, Y, Y.T @ Y
+                for row in self._touched:
+                    self._fold_in(row)
+                self._touched = None
+                self._n_plans += pending
+                self._pending -= pending
+                self.fit_version += 1
+
+    @property
+    def refit_due(self):
+        """True once enough plans were folded in since the last fit (see the class docstring)."""
+        return (self.refit_every is not None
+                and self._pending >= max(self.refit_every, self.refit_growth * self._n_plans))
+
+    def _background_fit(self):
+        try:
+            self.fit()
+        except Exception as e:
+            print("Collaborative refit failed:", e)
+
+    def add_plans(self, updates):
+        """
+        Fold saved plans in: updates is an iterable of (user_id, food rows given in the plan).
+        Each touched user's factors are re-solved once against the current food factors; a due refit
+        is started on a background thread and never runs on the caller's (saving) thread.
+        """
+        with self._lock:
+            touched = set()
+            for user_id, items in updates:
+                if len(items) == 0:
+                    continue
+                row = self._user_row(user_id)
+                for item in items:
+                    self._rows[row][item] = self._rows[row].get(item, 0) + 1
+                touched.add(user_id)
+                self._pending += 1
+            if len(self.user_factors) < len(self._rows):
+                grown = np.zeros((max(len(self._rows), 2 * len(self.user_factors)), self.factors))
+                grown[:len(self.user_factors)] = self.user_factors
+                self.user_factors = grown
+            if self._touched is not None:
+                self._touched.update(self.user_index[u] for u in touched)
+            if self.fitted:
+                for user_id in touched:
+                    self._fold_in(self.user_index[user_id])
+                    self.user_updates[user_id] = self.user_updates.get(user_id, 0) + 1
+            if self.background_refit and self.refit_due and (
+                    self._refit_thread is None or not self._refit_thread.is_alive()):
+                self._refit_thread = threading.Thread(target=self._background_fit, daemon=True)
+                self._refit_thread.start()
+
+    def _fold_in(self, row):
+        items = np.fromiter(self._rows[row], dtype=np.int64)
+        conf = 1 + self.alpha * np.fromiter(self._rows[row].values(), dtype=float)
+        Yi = self.item_factors[items]
+        A = self._YtY + (Yi.T * (conf - 1)) @ Yi + self.reg * np.eye(self.factors)
+        self.user_factors[row] = np.linalg.solve(A, Yi.T @ conf)
+
+    # ----- scoring -----
+
+    def user_version(self, user_id):
+        """Changes whenever the user's scores can change (for cache keys)."""
+        return [self.fit_version, self.user_updates.get(user_id, 0)]
+
+    def scores(self, user_ids, items):
+        """
+        Predicted preference of each user for the given food rows: user_ids (n,) and items (n, k)
+        -> (n, k) array, plus a boolean (n,) mask of users the model knows (others score 0).
+        """
+        items = np.asarray(items, dtype=np.int64)
+        known = np.zeros(len(user_ids), dtype=bool)
+        out = np.zeros(items.shape)
+        if not self.fitted:
+            return out, known
+        with self._lock:
+            # one consistent pair, even while a refit swaps new factors in
+            U, Y = self.user_factors, self.item_factors
+        rows = np.array([self.user_index.get(u, -1) for u in user_ids], dtype=np.int64)
+        known = (rows >= 0) & (rows < len(U))
+        if known.any():
+            out[known] = np.einsum('nf,nkf->nk', U[rows[known]], Y[items[known]])
+        return out, known
@@ -0,0 +1,159 @@
+# food_catalog.py
+import os
+import re
+from typing import List
+import numpy as np
+
+NUMERIC_COLUMNS = ('calories', 'protein', 'carbs', 'fats')
+TEXT_COLUMNS = ('name', 'category', 'portion', 'dietary_flags')
+# loaded and saved when present; only used for matching (FoodItem does not carry them)
+OPTIONAL_COLUMNS = ('ingredients',)
+
+
+class FoodItem:
+    __slots__ = ('name', 'calories', 'protein', 'carbs', 'fats', 'category', 'portion', 'dietary_flags')
+
+    def __init__(self, name: str, calories: int, protein: float, carbs: float,
+                 fats: float, category: str, portion: str, dietary_flags: List[str]):
+        self.name = name
+        self.calories = calories
+        self.protein = protein
+        self.carbs = carbs
+        self.fats = fats
+        self.category = category
+        self.portion = portion
+        self.dietary_flags = dietary_flags
+
+    def scaled(self, factor: float) -> "FoodItem":
+        """Copy of this food with nutrients and a gram portion scaled by `factor` (e.g. 1.5 x '100g' -> '150g')."""
+        if factor == 1:
+            return self
+        match = re.match(r'\s*(\d+(?:\.\d+)?)\s*g\b(.*)', self.portion)
+        if match:
+            portion = f"{float(match.group(1)) * factor:g}g{match.group(2)}"
+        else:
+            portion = f"{factor:g} x {self.portion}"
+        return FoodItem(self.name, self.calories * factor, self.protein * factor, self.carbs * factor,
+                        self.fats * factor, self.category, portion, self.dietary_flags)
+
+
+class FoodCatalog:
+    """
+    Struct-of-arrays food catalog: one NumPy array per column instead of one object per food.
+    - numeric columns (calories, protein, carbs, fats) are float arrays, memory-mapped when loaded from .npy;
+    - dietary_flags is stored comma-joined (same format as the recommender's DataFrame column);
+    - name -> row lookup is a dict (O(1)), built on first lookup;
+    - FoodItem objects are only created on access and then reused, so row i always maps to the same object.
+    Loaded from a CSV file (columns: name, calories, protein, carbs, fats, category, portion, dietary_flags,
+    optionally ingredients) or from a directory of .npy files written by save_npy.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self._name_index = None
+        self._items = {}
+
+    # ----- constructors -----
+
+    @classmethod
+    def from_items(cls, food_items):
+        food_items = list(food_items)
+        columns = {c: np.array([float(getattr(f, c)) for f in food_items], dtype=float) for c in NUMERIC_COLUMNS}
+        columns['name'] = np.array([f.name for f in food_items], dtype=str)
+        columns['category'] = np.array([f.category for f in food_items], dtype=str)
+        columns['portion'] = np.array([f.portion for f in food_items], dtype=str)
+        columns['dietary_flags'] = np.array([','.join(f.dietary_flags) for f in food_items], dtype=str)
+        return cls(columns)
+
+    @classmethod
+    def from_csv(cls, path):
+        import pandas as pd
+        df = pd.read_csv(path, dtype={c: str for c in TEXT_COLUMNS + OPTIONAL_COLUMNS}, keep_default_na=False)
+        columns = {c: df[c].to_numpy(dtype=float) for c in NUMERIC_COLUMNS}
+        for c in TEXT_COLUMNS + tuple(c for c in OPTIONAL_COLUMNS if c in df.columns):
+            columns[c] = df[c].to_numpy(dtype=str)
+        return cls(columns)
+
+    @classmethod
+    def from_npy(cls, directory, mmap=True):
+        """Load a catalog saved with save_npy; arrays are memory-mapped read-only when mmap=True."""
+        mode = 'r' if mmap else None
+        columns = {c: np.load(os.path.join(directory, c + '.npy'), mmap_mode=mode)
+                   for c in NUMERIC_COLUMNS + TEXT_COLUMNS}
+        for c in OPTIONAL_COLUMNS:
+            if os.path.exists(os.path.join(directory, c + '.npy')):
+                columns[c] = np.load(os.path.join(directory, c + '.npy'), mmap_mode=mode)
+        return cls(columns)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load from a .npy directory or a .csv file, depending on what `path` is."""
+        if os.path.isdir(path):
+            return cls.from_npy(path, mmap=mmap)
+        return cls.from_csv(path)
+
+    def save_npy(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for c in NUMERIC_COLUMNS + TEXT_COLUMNS + tuple(c for c in OPTIONAL_COLUMNS if c in self.columns):
+            np.save(os.path.join(directory, c + '.npy'), np.asarray(self.columns[c]))
+
+    # ----- access -----
+
+    def __len__(self):
+        return len(self.columns['name'])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        i = int(i)
+        item = self._items.get(i)
+        if item is None:
+            c = self.columns
+            flags = str(c['dietary_flags'][i])
+            item = FoodItem(str(c['name'][i]), float(c['calories'][i]), float(c['protein'][i]),
+                            float(c['carbs'][i]), float(c['fats'][i]), str(c['category'][i]),
+                            str(c['portion'][i]), flags.split(',') if flags else [])
+            self._items[i] = item
+        return item
+
+    @property
+    def _index(self):
+        if self._name_index is None:
+            self._name_index = {name: i for i, name in enumerate(self.columns['name'].tolist())}
+        return self._name_index
+
+    def index_of(self, name):
+        """Row index for a food name, or None."""
+        return self._index.get(name)
+
+    def get(self, name):
+        """FoodItem for a food name, or None."""
+        i = self._index.get(name)
+        return None if i is None else self[i]
+
+    def nutrients(self, rows=None):
+        """(n, 4) matrix of protein, carbs, fats, calories (the recommender's feature order), optionally for some rows."""
+        c = self.columns
+        cols = [c['protein'], c['carbs'], c['fats'], c['calories']]
+        if rows is not None:
+            cols = [np.asarray(col)[rows] for col in cols]
+        return np.column_stack(cols).astype(float)
+
+    def to_dataframe(self):
+        """DataFrame over the catalog columns (numeric columns are not copied where pandas allows)."""
+        import pandas as pd
+        return pd.DataFrame({c: self.columns[c] for c in ('name',) + NUMERIC_COLUMNS + ('category', 'portion', 'dietary_flags')},
+                            copy=False)
+
+    def extend(self, food_items):
+        """Append foods (new arrays are allocated; existing FoodItem objects stay valid). Returns new row indices."""
+        other = FoodCatalog.from_items(food_items)
+        start = len(self)
+        # foods added as FoodItem objects have no ingredients
+        blank = np.full(len(other), '', dtype=str)
+        self.columns = {c: np.concatenate([np.asarray(self.columns[c]), other.columns.get(c, blank)]) for c in self.columns}
+        for name, i in other._index.items():
+            self._index[name] = start + i
+        return np.arange(start, len(self))
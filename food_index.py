@@ -0,0 +1,222 @@
+# food_index.py
+import numpy as np
+
+
+def _normalize_rows(mat):
+    """L2-normalize rows; all-zero rows stay zero (they score 0 against everything, like sklearn's cosine)."""
+    mat = np.atleast_2d(np.asarray(mat, dtype=float))
+    norms = np.linalg.norm(mat, axis=1)
+    norms[norms == 0] = 1.0
+    return mat / norms[:, None]
+
+
+class LSHBackend:
+    """
+    Offline approximate-nearest-neighbour backend using random-hyperplane LSH.
+    Each table hashes a normalized vector to a bit code (one bit per hyperplane);
+    a query only looks at rows sharing a bucket in some table (optionally also buckets one bit away).
+    Pure NumPy, no network or extra packages needed.
+    """
+
+    def __init__(self, n_planes=12, n_tables=4, multi_probe=False, seed=0):
+        self.n_planes = n_planes
+        self.n_tables = n_tables
+        self.multi_probe = multi_probe
+        self.seed = seed
+        self._planes = None
+        self._tables = []
+        self._weights = 1 << np.arange(n_planes)
+
+    def config(self):
+        """Constructor parameters, JSON-able, so a fresh backend can be rebuilt (see backend_from_config)."""
+        return {'kind': 'lsh', 'n_planes': self.n_planes, 'n_tables': self.n_tables,
+                'multi_probe': self.multi_probe, 'seed': self.seed}
+
+    def _codes(self, vecs):
+        # (n_tables, n_rows) integer bucket codes
+        bits = np.einsum('tpd,nd->tnp', self._planes, vecs) > 0
+        return bits.astype(np.int64) @ self._weights
+
+    def build(self, vecs):
+        rng = np.random.default_rng(self.seed)
+        self._planes = rng.standard_normal((self.n_tables, self.n_planes, vecs.shape[1]))
+        self._tables = [dict() for _ in range(self.n_tables)]
+        self.add(np.arange(len(vecs)), vecs)
+
+    def add(self, positions, vecs):
+        if len(positions) == 0:
+            return
+        codes = self._codes(vecs)
+        for t, table in enumerate(self._tables):
+            for pos, code in zip(positions, codes[t]):
+                table.setdefault(int(code), set()).add(int(pos))
+
+    def remove(self, positions, vecs):
+        if len(positions) == 0:
+            return
+        codes = self._codes(vecs)
+        for t, table in enumerate(self._tables):
+            for pos, code in zip(positions, codes[t]):
+                bucket = table.get(int(code))
+                if bucket is not None:
+                    bucket.discard(int(pos))
+
+    def query(self, q):
+        """Return candidate row positions for one normalized query vector."""
+        codes = self._codes(q[None, :])[:, 0]
+        parts = []
+        for t, table in enumerate(self._tables):
+            code = int(codes[t])
+            probes = [code]
+            if self.multi_probe:
+                # also look at buckets one hyperplane away
+                probes += [code ^ (1 << p) for p in range(self.n_planes)]
+            for c in probes:
+                bucket = table.get(c)
+                if bucket:
+                    parts.append(np.fromiter(bucket, dtype=np.int64, count=len(bucket)))
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(parts))
+
+
+def backend_from_config(config):
+    """A new, unbuilt ANN backend from a backend's config() (None -> None)."""
+    if config is None:
+        return None
+    params = dict(config)
+    kind = params.pop('kind')
+    if kind != 'lsh':
+        raise ValueError(f"unknown ANN backend {kind!r}")
+    return LSHBackend(**params)
+
+
+class TopKIndex:
+    """
+    Cosine top-k retrieval over a food feature matrix.
+    - rows are L2-normalized once, so a query is a single dot product per row;
+    - selection uses argpartition (O(n)) and only the k winners are sorted;
+    - foods can be added or removed incrementally (removal is a tombstone);
+    - an optional ANN backend (e.g. LSHBackend) narrows the rows scored for large catalogs,
+      falling back to the exact scan when it returns too few usable candidates.
+    Row positions returned by the index are stable for the lifetime of the index.
+    """
+
+    def __init__(self, features, backend=None, min_rows_for_backend=5000):
+        vecs = _normalize_rows(features)
+        self._vecs = vecs
+        self._n = len(vecs)
+        self._live = np.ones(self._n, dtype=bool)
+        self.backend = backend
+        self.min_rows_for_backend = min_rows_for_backend
+        if self.backend is not None:
+            self.backend.build(vecs)
+
+    @classmethod
+    def from_normalized(cls, vecs, live=None, backend=None, min_rows_for_backend=5000):
+        """Wrap rows that are already L2-normalized (e.g. arrays in shared memory) without copying them."""
+        index = cls.__new__(cls)
+        index._vecs = vecs
+        index._n = len(vecs)
+        index._live = np.ones(index._n, dtype=bool) if live is None else np.array(live, dtype=bool)
+        index.backend = backend
+        index.min_rows_for_backend = min_rows_for_backend
+        if backend is not None:
+            backend.build(vecs)
+        return index
+
+    @property
+    def vectors(self):
+        """The normalized rows (positions [0, n))."""
+        return self._vecs[:self._n]
+
+    def __len__(self):
+        return int(self._live[:self._n].sum())
+
+    @property
+    def live_mask(self):
+        """Boolean mask over positions [0, n) of rows that have not been removed."""
+        return self._live[:self._n]
+
+    def add(self, features):
+        """Append new rows; returns their positions. Storage grows geometrically (amortized O(1) per row)."""
+        vecs = _normalize_rows(features)
+        m = len(vecs)
+        if self._n + m > len(self._vecs):
+            cap = max(self._n + m, 2 * len(self._vecs), 16)
+            grown = np.zeros((cap, self._vecs.shape[1]))
+            grown[:self._n] = self._vecs[:self._n]
+            live = np.zeros(cap, dtype=bool)
+            live[:self._n] = self._live[:self._n]
+            self._vecs, self._live = grown, live
+        positions = np.arange(self._n, self._n + m)
+        self._vecs[positions] = vecs
+        self._live[positions] = True
+        self._n += m
+        if self.backend is not None:
+            self.backend.add(positions, vecs)
+        return positions
+
+    def remove(self, positions):
+        """Tombstone rows so they are never returned again."""
+        positions = np.asarray(positions, dtype=np.int64)
+        positions = positions[self._live[positions]]
+        self._live[positions] = False
+        if self.backend is not None:
+            self.backend.remove(positions, self._vecs[positions])
+
+    def _topk_from_scores(self, scores, top_k):
+        # scores: 1-D, invalid rows already set to -inf
+        valid = int(np.isfinite(scores).sum())
+        k = min(top_k, valid)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        part = np.argpartition(-scores, k - 1)[:k]
+        order = np.argsort(-scores[part], kind='stable')
+        top = part[order]
+        return top, scores[top]
+
+    def search(self, query, top_k=30, allowed=None):
+        """
+        Return (positions, scores) of the top_k rows most similar to `query`,
+        best first. `allowed` is an optional boolean mask over positions.
+        """
+        q = _normalize_rows(query)[0]
+        usable = self.live_mask if allowed is None else (self.live_mask & allowed[:self._n])
+        return self._search_one(q, top_k, usable)
+
+    def _uses_backend(self):
+        return self.backend is not None and self._n >= self.min_rows_for_backend
+
+    def _search_one(self, q, top_k, usable):
+        # q normalized; backend candidates first, exact scan when they are too few
+        if self._uses_backend():
+            cand = self.backend.query(q)
+            cand = cand[usable[cand]]
+            if len(cand) >= top_k:
+                top, top_scores = self._topk_from_scores(self._vecs[cand] @ q, top_k)
+                return cand[top], top_scores
+        scores = self._vecs[:self._n] @ q
+        scores[~usable] = -np.inf
+        return self._topk_from_scores(scores, top_k)
+
+    def search_batch(self, queries, top_k=30, allowed=None):
+        """
+        Top-k for many queries at once: one matrix product over the usable rows, or, when an ANN
+        backend is set and the catalog has at least min_rows_for_backend rows, one backend lookup
+        per query (each falling back to the exact scan like search()).
+        Returns an (n_queries, k) position array, k = min(top_k, number of usable rows).
+        """
+        qs = _normalize_rows(queries)
+        usable = self.live_mask if allowed is None else (self.live_mask & allowed[:self._n])
+        cols = np.flatnonzero(usable)
+        k = min(top_k, len(cols))
+        if k == 0:
+            return np.empty((len(qs), 0), dtype=np.int64)
+        if self._uses_backend():
+            return np.vstack([self._search_one(q, k, usable)[0] for q in qs])
+        scores = qs @ self._vecs[cols].T
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        part_scores = np.take_along_axis(scores, part, axis=1)
+        order = np.argsort(-part_scores, axis=1, kind='stable')
+        return cols[np.take_along_axis(part, order, axis=1)]
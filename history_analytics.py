@@ -0,0 +1,121 @@
+# history_analytics.py
+# Daily / weekly / monthly nutrition rollups over the meal history, with deviation from targets.
+#   analytics = HistoryAnalytics(planner.history_store, user_id="default")
+#   analytics.refresh()                       # reads only plans added since the last refresh
+#   analytics.rollup('week')                  # {'period', 'plans', 'total', 'mean'}
+#   analytics.deviation(planner.calculate_daily_needs(user), 'month')
+import os
+import numpy as np
+from history_store import NUTRIENTS
+
+PERIODS = ('day', 'week', 'month')
+
+
+def _period_keys(days, period):
+    """Map datetime64[D] days to the first day of their period (weeks start on Monday)."""
+    if period == 'day':
+        return days
+    if period == 'week':
+        n = days.astype(np.int64)
+        # 1970-01-01 was a Thursday
+        return (n - (n + 3) % 7).astype('datetime64[D]')
+    if period == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    raise ValueError(f"period must be one of {PERIODS}, got {period!r}")
+
+
+def _group_sum(keys, values, counts):
+    """Sum values (n, 4) and counts (n,) over equal keys; returns sorted unique keys and the sums."""
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    sums = np.zeros((len(uniq), values.shape[1]))
+    np.add.at(sums, inverse, values)
+    return uniq, sums, np.bincount(inverse, weights=counts, minlength=len(uniq)).astype(np.int64)
+
+
+class HistoryAnalytics:
+    """
+    Columnar nutrition analytics for one user (or everyone with user_id=None).
+    The cached partial aggregate is one row per calendar day (nutrient sums and plan count);
+    refresh() streams only plans with a higher id than the last one seen and merges them in,
+    so appending plans never triggers a rescan. Weekly and monthly rollups are regrouped from
+    the daily partials. Each plan counts as one day's intake, so `mean` is the average plan.
+    """
+
+    def __init__(self, history_store, user_id=None):
+        self.history_store = history_store
+        self.user_id = user_id
+        self.last_id = 0
+        self.days = np.empty(0, dtype='datetime64[D]')
+        self.sums = np.zeros((0, len(NUTRIENTS)))
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def refresh(self, batch_size=100_000):
+        """Fold plans appended since the last refresh into the daily partials. Returns the number of new plans."""
+        new = 0
+        for ids, dates, nutrients in self.history_store.iter_total_arrays(self.user_id, self.last_id, batch_size):
+            self.days, self.sums, self.counts = _group_sum(
+                np.concatenate([self.days, dates]),
+                np.vstack([self.sums, np.nan_to_num(nutrients)]),
+                np.concatenate([self.counts, np.ones(len(ids), dtype=np.int64)]))
+            self.last_id = int(ids[-1])
+            new += len(ids)
+        return new
+
+    def rollup(self, period='day', start=None, end=None):
+        """
+        Aggregates per period (inclusive 'YYYY-MM-DD' range on plan dates): dict of arrays
+        period (datetime64[D] period start), plans (count), total and mean (n, 4) in NUTRIENTS order.
+        """
+        keep = np.ones(len(self.days), dtype=bool)
+        if start is not None:
+            keep &= self.days >= np.datetime64(start, 'D')
+        if end is not None:
+            keep &= self.days <= np.datetime64(end, 'D')
+        keys, totals, plans = _group_sum(_period_keys(self.days[keep], period), self.sums[keep], self.counts[keep])
+        return {'period': keys, 'plans': plans, 'total': totals, 'mean': totals / np.maximum(plans, 1)[:, None]}
+
+    def deviation(self, daily_needs, period='day', start=None, end=None):
+        """
+        Rollup plus the average plan's deviation from daily_needs (as returned by
+        DietPlanner.calculate_daily_needs): 'deviation' in kcal/grams and 'deviation_pct' in percent.
+        """
+        result = self.rollup(period, start, end)
+        target = np.array([daily_needs[n] for n in NUTRIENTS], dtype=float)
+        result['target'] = target
+        result['deviation'] = result['mean'] - target
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['deviation_pct'] = np.where(target > 0, 100 * result['deviation'] / target, np.nan)
+        return result
+
+    def save(self, path):
+        """Persist the partial aggregates so a restart only reads plans added since."""
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, days=self.days, sums=self.sums, counts=self.counts, last_id=np.array(self.last_id),
+                 user_id=np.array('' if self.user_id is None else self.user_id),
+                 db=np.array(os.path.abspath(self.history_store.path)))
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Restore partials saved for the same user and database; returns False if they do not match."""
+        with np.load(path) as data:
+            if (str(data['user_id']) != ('' if self.user_id is None else self.user_id)
+                    or str(data['db']) != os.path.abspath(self.history_store.path)):
+                return False
+            self.days, self.sums, self.counts = data['days'], data['sums'], data['counts']
+            self.last_id = int(data['last_id'])
+        return True
+
+
+def format_rollup(result):
+    """Text table of a rollup / deviation result."""
+    has_dev = 'deviation' in result
+    header = f"{'period':12s} {'plans':>6s} " + " ".join(f"{n:>9s}" for n in NUTRIENTS)
+    if has_dev:
+        header += "  " + " ".join(f"{'d' + n[:4] + '%':>8s}" for n in NUTRIENTS)
+    lines = [header]
+    for i, key in enumerate(result['period']):
+        line = f"{str(key):12s} {result['plans'][i]:6d} " + " ".join(f"{v:9.0f}" for v in result['mean'][i])
+        if has_dev:
+            line += "  " + " ".join(f"{v:8.1f}" for v in result['deviation_pct'][i])
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,226 @@
+# history_store.py
+import csv
+import json
+import os
+import sqlite3
+import threading
+from itertools import groupby
+from instrumentation import metrics, timed
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    calories REAL, protein REAL, carbs REAL, fats REAL
+);
+CREATE TABLE IF NOT EXISTS meals (
+    plan_id INTEGER NOT NULL,
+    meal_number INTEGER NOT NULL,
+    calories REAL, protein REAL, carbs REAL, fats REAL,
+    PRIMARY KEY (plan_id, meal_number)
+);
+CREATE TABLE IF NOT EXISTS meal_foods (
+    plan_id INTEGER NOT NULL,
+    meal_number INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    food_name TEXT NOT NULL,
+    portion TEXT,
+    PRIMARY KEY (plan_id, meal_number, position)
+);
+CREATE INDEX IF NOT EXISTS plans_user_date ON plans (user_id, date);
+CREATE INDEX IF NOT EXISTS plans_date ON plans (date);
+"""
+
+NUTRIENTS = ('calories', 'protein', 'carbs', 'fats')
+
+
+class HistoryStore:
+    """
+    SQLite-backed meal history (replaces the JSON-blob rows of meal_history.csv).
+    A saved plan becomes one `plans` row (daily totals), one `meals` row per meal and one
+    `meal_foods` row per food, keyed by user and date, so reads use indexes instead of
+    scanning and JSON-decoding the whole file.
+    Writes are batched into one transaction; reads are streamed from the cursor.
+    """
+
+    def __init__(self, path='meal_history.db'):
+        self.path = path
+        # shared between GUI / service threads; the lock serializes access to the connection
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ----- writes -----
+
+    def append(self, user_id, date, summary):
+        """Store one plan summary (as produced by DietPlanner.get_meal_plan_summary). Returns its plan id."""
+        return self.append_many([(user_id, date, summary)])[0]
+
+    @timed("history_store_append")
+    def append_many(self, entries):
+        """Store many (user_id, date, summary) tuples in a single transaction. Returns the plan ids."""
+        ids = []
+        with self._lock, self._conn:
+            cur = self._conn.cursor()
+            for user_id, date, summary in entries:
+                totals = summary.get('total_nutrition', {})
+                cur.execute("INSERT INTO plans (user_id, date, calories, protein, carbs, fats) VALUES (?,?,?,?,?,?)",
+                            (user_id, date) + tuple(totals.get(n, 0) for n in NUTRIENTS))
+                plan_id = cur.lastrowid
+                meals = summary.get('meals', [])
+                cur.executemany("INSERT INTO meals VALUES (?,?,?,?,?,?)",
+                                [(plan_id, m['meal_number']) + tuple(m.get('nutrition', {}).get(n, 0) for n in NUTRIENTS)
+                                 for m in meals])
+                cur.executemany("INSERT INTO meal_foods VALUES (?,?,?,?,?)",
+                                [(plan_id, m['meal_number'], pos, f['name'], f.get('portion'))
+                                 for m in meals for pos, f in enumerate(m['foods'])])
+                ids.append(plan_id)
+        return ids
+
+    # ----- reads -----
+
+    def _where(self, user_id, start, end):
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append("p.user_id = ?")
+            params.append(user_id)
+        if start is not None:
+            clauses.append("p.date >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("p.date <= ?")
+            params.append(end)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _stream_batches(self, sql, params, batch_size=1000):
+        # fetch in batches so iteration never holds the whole result in memory
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            rows = cur.fetchmany(batch_size)
+        while rows:
+            yield rows
+            with self._lock:
+                rows = cur.fetchmany(batch_size)
+
+    def _stream(self, sql, params, batch_size=1000):
+        for rows in self._stream_batches(sql, params, batch_size):
+            yield from rows
+
+    def iter_totals(self, user_id=None, start=None, end=None, offset=0, limit=None):
+        """
+        Stream plan-level rows as dicts {id, user_id, date, calories, protein, carbs, fats},
+        ordered by date then insertion. Dates are 'YYYY-MM-DD' strings and the range is inclusive.
+        """
+        where, params = self._where(user_id, start, end)
+        sql = ("SELECT p.id, p.user_id, p.date, p.calories, p.protein, p.carbs, p.fats FROM plans p"
+               + where + " ORDER BY p.date, p.id LIMIT ? OFFSET ?")
+        params += [-1 if limit is None else limit, offset]
+        for row in self._stream(sql, params):
+            yield dict(zip(('id', 'user_id', 'date') + NUTRIENTS, row))
+
+    def iter_total_arrays(self, user_id=None, after_id=0, batch_size=100_000):
+        """
+        Stream plan totals as column arrays, in plan id order and only for ids > after_id:
+        yields (ids int64, dates datetime64[D], nutrients float (n, 4) in NUTRIENTS order).
+        """
+        import numpy as np
+        where, params = self._where(user_id, None, None)
+        where += (" AND" if where else " WHERE") + " p.id > ?"
+        sql = ("SELECT p.id, p.date, p.calories, p.protein, p.carbs, p.fats FROM plans p"
+               + where + " ORDER BY p.id")
+        for rows in self._stream_batches(sql, params + [after_id], batch_size):
+            ids, dates, *nutrients = zip(*rows)
+            yield (np.array(ids, dtype=np.int64), np.array([d[:10] for d in dates], dtype='datetime64[D]'),
+                   np.column_stack([np.array(col, dtype=float) for col in nutrients]))
+
+    def iter_food_counts(self, batch_size=100_000):
+        """
+        Stream (user_ids, food_names, counts) lists, one batch at a time: how often each user was
+        given each food, aggregated in SQL so the per-food rows never reach Python.
+        """
+        sql = ("SELECT p.user_id, f.food_name, COUNT(*) FROM plans p JOIN meal_foods f ON f.plan_id = p.id"
+               " GROUP BY p.user_id, f.food_name")
+        for rows in self._stream_batches(sql, [], batch_size):
+            yield tuple(map(list, zip(*rows)))
+
+    def iter_entries(self, user_id=None, start=None, end=None):
+        """
+        Stream full history entries {"date", "user_id", "summary"} in the same shape the planner
+        keeps in UserProfile.meal_history, rebuilt from the per-meal and per-food rows.
+        """
+        where, params = self._where(user_id, start, end)
+        sql = ("SELECT p.id, p.user_id, p.date, p.calories, p.protein, p.carbs, p.fats,"
+               " m.meal_number, m.calories, m.protein, m.carbs, m.fats, f.food_name, f.portion"
+               " FROM plans p JOIN meals m ON m.plan_id = p.id"
+               " LEFT JOIN meal_foods f ON f.plan_id = m.plan_id AND f.meal_number = m.meal_number"
+               + where + " ORDER BY p.date, p.id, m.meal_number, f.position")
+        for _, plan_rows in groupby(self._stream(sql, params), key=lambda r: r[0]):
+            plan_rows = list(plan_rows)
+            first = plan_rows[0]
+            meals = []
+            for meal_number, meal_rows in groupby(plan_rows, key=lambda r: r[7]):
+                meal_rows = list(meal_rows)
+                meals.append({
+                    "meal_number": meal_number,
+                    "foods": [{"name": r[12], "portion": r[13]} for r in meal_rows if r[12] is not None],
+                    "nutrition": dict(zip(NUTRIENTS, meal_rows[0][8:12])),
+                })
+            summary = {"total_nutrition": dict(zip(NUTRIENTS, first[3:7])), "meals": meals}
+            yield {"date": first[2], "user_id": first[1], "summary": summary}
+
+    @timed("history_store_read")
+    def recent_entries(self, user_id, n=10):
+        """Last n entries for a user, oldest first (uses the (user_id, date) index)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT date FROM plans WHERE user_id = ? ORDER BY date DESC, id DESC LIMIT 1 OFFSET ?",
+                (user_id, n - 1)).fetchone()
+        start = row[0] if row else None
+        return list(self.iter_entries(user_id=user_id, start=start))[-n:]
+
+    def count(self, user_id=None, start=None, end=None):
+        where, params = self._where(user_id, start, end)
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM plans p" + where, params).fetchone()[0]
+
+    # ----- migration -----
+
+    def migrate_from_csv(self, csv_path='meal_history.csv', user_id='default', batch_size=1000):
+        """
+        Import the old meal_history.csv (date, JSON summary) rows. Rows are streamed and written
+        in batches; unreadable rows are skipped. Returns the number of plans imported.
+        """
+        imported = 0
+        batch = []
+        with open(csv_path, 'r', newline='') as file:
+            for row in csv.reader(file):
+                try:
+                    date, summary = row
+                    batch.append((user_id, date, json.loads(summary)))
+                except (ValueError, TypeError) as e:
+                    print("Skipping unreadable history row:", e)
+                    metrics.incr("history_rows_skipped")
+                    continue
+                if len(batch) >= batch_size:
+                    imported += len(self.append_many(batch))
+                    batch = []
+        if batch:
+            imported += len(self.append_many(batch))
+        return imported
+
+
+def open_history_store(path='meal_history.db', legacy_csv='meal_history.csv', user_id='default'):
+    """Open the store, importing the legacy CSV once if the database is new and the CSV exists."""
+    is_new = not os.path.exists(path)
+    store = HistoryStore(path)
+    if is_new and legacy_csv and os.path.exists(legacy_csv):
+        n = store.migrate_from_csv(legacy_csv, user_id=user_id)
+        print(f"Migrated {n} history rows from {legacy_csv} to {path}")
+    return store
@@ -0,0 +1,142 @@
+# instrumentation.py
+# Per-stage timers and counters for the planner. Disabled by default; when disabled a timer is a
+# shared no-op context manager and a counter is a single attribute check.
+#   from instrumentation import metrics
+#   metrics.enable()
+#   with metrics.timer("candidate_retrieval"): ...
+#   metrics.incr("random_meal_fallback")
+#   metrics.export_json("metrics.json")
+# Setting DIET_PLANNER_METRICS=1 in the environment enables it at import time.
+import functools
+import json
+import os
+import threading
+import time
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('_metrics', '_name', '_start')
+
+    def __init__(self, metrics, name):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.observe(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class Metrics:
+    """
+    In-process metrics registry: timers keep count / total / max seconds per stage, counters keep
+    integer totals. Sinks (callables taking kind, name, value) can be plugged in to forward every
+    observation elsewhere, e.g. to a log or a metrics client.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._counters = {}
+        self._sinks = []
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def add_sink(self, sink):
+        self._sinks.append(sink)
+
+    def timer(self, name):
+        """Context manager timing a block under `name` (no-op while disabled)."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            stat = self._timers.get(name)
+            if stat is None:
+                self._timers[name] = [1, seconds, seconds]
+            else:
+                stat[0] += 1
+                stat[1] += seconds
+                stat[2] = max(stat[2], seconds)
+        for sink in self._sinks:
+            sink('timer', name, seconds)
+
+    def incr(self, name, n=1):
+        """Increase counter `name` by n (no-op while disabled)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+        for sink in self._sinks:
+            sink('counter', name, n)
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        """Plain-dict copy of all timers (count, total_ms, mean_ms, max_ms) and counters."""
+        with self._lock:
+            timers = {name: {'count': c, 'total_ms': round(total * 1000, 3), 'mean_ms': round(total / c * 1000, 4),
+                             'max_ms': round(mx * 1000, 3)}
+                      for name, (c, total, mx) in self._timers.items()}
+            counters = dict(self._counters)
+        return {'timers': timers, 'counters': counters}
+
+    def export_json(self, path):
+        """Write the current snapshot to a local JSON file (written to a temp file, then renamed)."""
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(dict(self.snapshot(), exported_at=time.time()), f, indent=2)
+        os.replace(tmp, path)
+
+    def format_text(self):
+        """Human-readable table of the snapshot."""
+        snap = self.snapshot()
+        lines = [f"{'stage':28s} {'count':>8s} {'total ms':>12s} {'mean ms':>10s} {'max ms':>10s}"]
+        for name, t in sorted(snap['timers'].items()):
+            lines.append(f"{name:28s} {t['count']:8d} {t['total_ms']:12.3f} {t['mean_ms']:10.4f} {t['max_ms']:10.3f}")
+        for name, value in sorted(snap['counters'].items()):
+            lines.append(f"{name:28s} {value:8d}")
+        return "\n".join(lines)
+
+
+# process-wide registry used by the planner modules
+metrics = Metrics(enabled=os.environ.get('DIET_PLANNER_METRICS') == '1')
+
+
+def timed(name):
+    """Decorator timing every call of a function under `name` in the global registry."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return fn(*args, **kwargs)
+            with _Timer(metrics, name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
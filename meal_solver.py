@@ -0,0 +1,110 @@
+# meal_solver.py
+import time
+import numpy as np
+
+# nutrient order used by the solver: calories, protein, carbs, fats
+MACROS = ('calories', 'protein', 'carbs', 'fats')
+
+
+def _design_matrix(nutr, targets, meals_per_day, macro_weights, meal_weight):
+    """
+    Build the linear system A x ~= b for the portion vector x (meals_per_day * K entries, meal-major).
+    Rows 0..3: daily totals of each macro relative to its target.
+    Rows 4..: calories of each meal relative to an even share of the daily calories.
+    """
+    K = nutr.shape[0]
+    M = meals_per_day
+    A = np.zeros((4 + M, M * K))
+    b = np.zeros(4 + M)
+    for j in range(4):
+        A[j] = np.tile(macro_weights[j] * nutr[:, j] / targets[j], M)
+        b[j] = macro_weights[j]
+    meal_cal = targets[0] / M
+    for m in range(M):
+        A[4 + m, m * K:(m + 1) * K] = meal_weight * nutr[:, 0] / meal_cal
+        b[4 + m] = meal_weight
+    return A, b
+
+
+def _fista(A, b, x0, lower, upper, mask, ridge, deadline, tol, meal_tol, n_macros, max_iter=500):
+    """
+    Accelerated projected gradient for min ||Ax - b||^2 + ridge*||x||^2 with lower <= x <= upper
+    and x fixed at 0 outside `mask`. Stops early once every relative error is within tolerance,
+    or when the deadline passes.
+    """
+    L = 2 * (np.linalg.norm(A, 2) ** 2 + ridge)
+    scale = np.abs(b)
+    scale[scale == 0] = 1.0
+    x = np.clip(x0, lower, upper) * mask
+    y, t = x.copy(), 1.0
+    for it in range(max_iter):
+        grad = 2 * (A.T @ (A @ y - b)) + 2 * ridge * y
+        x_new = np.clip(y - grad / L, lower, upper) * mask
+        t_new = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = x_new + ((t - 1) / t_new) * (x_new - x)
+        x, t = x_new, t_new
+        if it % 10 == 9:
+            rel = np.abs(A @ x - b) / scale
+            # early exit: daily macros and per-meal calories already close enough
+            if rel[:n_macros].max() <= tol and rel[n_macros:].max(initial=0) <= meal_tol:
+                break
+            if time.perf_counter() >= deadline:
+                break
+    return x
+
+
+def solve_day(nutr, targets, meals_per_day, time_budget=0.05, max_items_per_meal=4,
+              min_portion=0.5, max_portion=3.0, portion_step=0.25, tol=0.05, meal_tol=0.10,
+              macro_weights=(2.0, 1.0, 1.0, 1.0), meal_weight=0.5, ridge=1e-3):
+    """
+    Choose foods and continuous portion sizes for all meals of a day at once.
+    nutr: (K, 4) nutrients per base portion (calories, protein, carbs, fats) of the candidate foods,
+          best candidates first.
+    targets: daily (calories, protein, carbs, fats), as from DietPlanner.calculate_daily_needs.
+    Portions are multiples of the base portion (1.0 = the catalog portion, e.g. 100g).
+    Returns an (meals_per_day, K) array of portion multipliers (0 = food not used in that meal).
+
+    Two passes of projected gradient share the time budget: the first runs on every allowed
+    (meal, food) pair, then each meal keeps its max_items_per_meal largest contributors and
+    the second pass re-fits portions on that support with min_portion as a floor.
+    """
+    nutr = np.asarray(nutr, dtype=float)
+    targets = np.maximum(np.asarray(targets, dtype=float), 1.0)
+    K, M = nutr.shape[0], max(1, int(meals_per_day))
+    if K == 0:
+        return np.zeros((M, 0))
+    deadline_total = time.perf_counter() + time_budget
+    A, b = _design_matrix(nutr, targets, M, macro_weights, meal_weight)
+
+    # spread candidates across meals (round-robin by rank) when there are enough for variety;
+    # otherwise every meal may use every candidate
+    support = np.ones((M, K), dtype=bool)
+    if K >= M * max_items_per_meal:
+        support = (np.arange(K)[None, :] % M) == np.arange(M)[:, None]
+    mask = support.reshape(-1).astype(float)
+
+    # start from an even split of each meal's calories over its candidates
+    share = targets[0] / M / np.maximum(support.sum(axis=1, keepdims=True), 1)
+    x0 = (share / np.maximum(nutr[:, 0], 1.0)[None, :] * support).reshape(-1)
+    phase1_deadline = time.perf_counter() + time_budget / 2
+    x = _fista(A, b, x0, 0.0, max_portion, mask, ridge, phase1_deadline, tol, meal_tol, 4)
+
+    # keep the largest calorie contributors of each meal
+    X = x.reshape(M, K)
+    contrib = X * nutr[:, 0][None, :]
+    keep_n = min(max_items_per_meal, K)
+    top = np.argsort(-contrib, axis=1)[:, :keep_n]
+    kept = np.zeros((M, K), dtype=bool)
+    np.put_along_axis(kept, top, True, axis=1)
+    kept &= (X > 0.1 * min_portion) & support
+    # a meal that ended up empty keeps its best-ranked candidate
+    empty = ~kept.any(axis=1)
+    if empty.any():
+        first = np.argmax(support, axis=1)
+        kept[empty, first[empty]] = True
+    mask2 = kept.reshape(-1).astype(float)
+    x = _fista(A, b, x, min_portion * mask2, max_portion, mask2, ridge, deadline_total, tol, meal_tol, 4)
+
+    X = x.reshape(M, K)
+    X = np.where(kept, np.clip(np.round(X / portion_step) * portion_step, min_portion, max_portion), 0.0)
+    return X
@@ -0,0 +1,69 @@
+# plan_cache.py
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe LRU cache with hit/miss statistics.
+    Used by SimpleRecommender to reuse candidate lists and assembled meals across users who share
+    the same preference vector, filters and calorie target.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._data),
+                "maxsize": self.maxsize, "hit_rate": (self.hits / total) if total else 0.0}
+
+
+def cache_key(kind, user_vec, dietary_restrictions, allergies, catalog_version, **params):
+    """
+    Canonical key: the preference vector rounded to 6 decimals, restrictions and allergies
+    lower-cased and sorted, the catalog version and any extra parameters (top_k, calorie target, ...).
+    Equivalent requests map to the same 16-byte digest regardless of list order or float noise.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(kind.encode())
+    # (+ 0.0 turns -0.0 into 0.0 so both hash the same)
+    h.update((np.round(np.asarray(user_vec, dtype=float), 6) + 0.0).tobytes())
+    h.update(json.dumps([sorted(r.lower() for r in dietary_restrictions or []),
+                         sorted(a.lower() for a in allergies or []),
+                         catalog_version, sorted(params.items())]).encode())
+    return h.digest()
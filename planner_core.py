@@ -0,0 +1,559 @@
+# planner_core.py
+# Headless planner: no tkinter, and the recommender (pandas) is only imported when a planner is built.
+from typing import List, Dict
+import math
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from food_catalog import FoodItem, FoodCatalog
+from history_store import open_history_store
+from preferences import PreferenceStore
+from calorie_predictor import (load_calorie_model, predict_calories_batch, MODEL_DIR, latest_model_version,
+                               load_model_version)
+from instrumentation import metrics, timed
+
+# ----- UserProfile, DietPlanner classes (shared by the GUI, batch jobs and workers) -----
+
+def number_field(data: Dict, key: str, cast=float, default=None):
+    """
+    data[key] converted with cast (float or int); numeric strings are accepted, booleans and
+    non-finite values are not. A missing or null value gives default, or is an error when default is None.
+    Raises ValueError on bad values.
+    """
+    value = data.get(key)
+    if value is None:
+        if default is None:
+            raise ValueError(f"{key} is required")
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{key} must be a number, got {value!r}")
+    try:
+        number = cast(value)
+    except ValueError:
+        raise ValueError(f"{key} must be a number, got {value!r}")
+    if not math.isfinite(number):
+        raise ValueError(f"{key} must be finite, got {value!r}")
+    return number
+
+
+def _string_list(data: Dict, key: str) -> List[str]:
+    # a bare string would otherwise be iterated one character at a time
+    value = data.get(key)
+    if value is None:
+        return []
+    if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f"{key} must be a list of strings, got {value!r}")
+    return list(value)
+
+
+class UserProfile:
+    def __init__(self):
+        self.weight = 0
+        self.height = 0
+        self.age = 0
+        self.user_id = "default"
+        self.gender = ""
+        self.activity_level = ""
+        self.goal = ""
+        self.dietary_restrictions = []
+        self.allergies = []
+        self.meals_per_day = 3
+        self.meal_history = []
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "UserProfile":
+        """Build a profile from a plain dict (e.g. a JSON request body). Raises ValueError on bad values."""
+        profile = cls()
+        profile.weight = number_field(data, "weight")
+        profile.height = number_field(data, "height")
+        profile.age = number_field(data, "age", int)
+        profile.meals_per_day = number_field(data, "meals_per_day", int, default=3)
+        if profile.meals_per_day < 1:
+            raise ValueError(f"meals_per_day must be at least 1, got {profile.meals_per_day}")
+        profile.user_id = str(data.get("user_id", "default"))
+        profile.gender = str(data.get("gender", ""))
+        profile.activity_level = str(data.get("activity_level", "")).lower()
+        profile.goal = str(data.get("goal", "")).lower()
+        profile.dietary_restrictions = [r.lower() for r in _string_list(data, "dietary_restrictions")]
+        profile.allergies = _string_list(data, "allergies")
+        return profile
+
+    def to_dict(self) -> Dict:
+        """Plain-dict form accepted by from_dict (meal_history is not included)."""
+        return {"user_id": self.user_id, "weight": self.weight, "height": self.height, "age": self.age,
+                "gender": self.gender, "activity_level": self.activity_level, "goal": self.goal,
+                "dietary_restrictions": list(self.dietary_restrictions), "allergies": list(self.allergies),
+                "meals_per_day": self.meals_per_day}
+
+class DietPlanner:
+    def __init__(self, catalog_path: str = 'foods.csv', history_path: str = 'meal_history.db', cache_size: int = 4096,
+                 model_dir: str = MODEL_DIR, model_check_interval: float = 5.0, collab_weight: float = 0.0,
+                 ann_backend=None):
+        self.food_database = self._initialize_food_database(catalog_path)
+        self.user_profile = UserProfile()
+        self._history_path = history_path
+        self._open_lock = threading.Lock()
+        # Indexed history store (imports the old meal_history.csv the first time)
+        self.history_store = open_history_store(history_path)
+        # Per-user preference vectors, updated whenever a plan is saved
+        self.preferences = PreferenceStore(history_path)
+        # Per-user HistoryAnalytics (cached partial aggregates), created on first report
+        self._analytics = {}
+        # Latest versioned calorie model (see calorie_training.py), re-checked every model_check_interval
+        # seconds so a newly published version is used without a restart
+        self.model_dir = model_dir
+        self.model_check_interval = model_check_interval
+        self.model_version = None
+        self._model_checked_at = time.monotonic()
+        if not self.reload_calorie_model():
+            # nothing published: .npz runtime first, then the sklearn pickle
+            self.calorie_model = load_calorie_model()
+        # Recommender shares the food catalog arrays with the planner
+        # (imported here so `import planner_core` stays cheap for workers and CLIs);
+        # ann_backend (e.g. food_index.LSHBackend()) makes top-k retrieval sub-linear on large catalogs
+        from recommender import SimpleRecommender
+        self.recommender = SimpleRecommender(self.food_database, ann_backend=ann_backend)
+        # LRU cache of candidates / assembled meals (cache_size=0 disables it)
+        self.recommender.enable_cache(cache_size)
+        # Collaborative filtering over everyone's history, blended into candidate ranking (0 disables it)
+        if collab_weight > 0:
+            from collab_filter import CollaborativeFilter
+            collab = CollaborativeFilter.from_history(self.history_store, self.food_database.index_of,
+                                                      n_items=len(self.food_database))
+            self.recommender.set_collaborative(collab, weight=collab_weight)
+
+    @classmethod
+    def from_components(cls, catalog: FoodCatalog, recommender, calorie_model, history_store=None, preferences=None,
+                        history_path: str = None):
+        """
+        Assemble a planner from already-built parts (e.g. arrays attached from shared memory).
+        Without a history store / preference store it can only plan (generate_meal_plans with
+        save_history=False and explicit pref_vecs, or build_meal_plan for users with no state).
+        history_path instead opens both stores on first use (first saved plan or preference lookup).
+        """
+        planner = cls.__new__(cls)
+        planner.food_database = catalog
+        planner.user_profile = UserProfile()
+        planner._history_path = history_path
+        planner._open_lock = threading.Lock()
+        planner.history_store = history_store
+        planner.preferences = preferences
+        planner._analytics = {}
+        planner.calorie_model = calorie_model
+        planner.model_dir = None
+        planner.model_version = None
+        planner.recommender = recommender
+        return planner
+
+    @property
+    def history_store(self):
+        """The HistoryStore; opened on first use when the planner was only given its path."""
+        if self._history_store is None and self._history_path:
+            with self._open_lock:
+                if self._history_store is None:
+                    self._history_store = open_history_store(self._history_path)
+        return self._history_store
+
+    @history_store.setter
+    def history_store(self, store):
+        self._history_store = store
+
+    @property
+    def preferences(self):
+        """The PreferenceStore; opened on first use when the planner was only given the history path."""
+        if self._preferences is None and self._history_path:
+            with self._open_lock:
+                if self._preferences is None:
+                    self._preferences = PreferenceStore(self._history_path)
+        return self._preferences
+
+    @preferences.setter
+    def preferences(self, store):
+        self._preferences = store
+
+    @property
+    def saves_history(self) -> bool:
+        """False for a plan-only planner (no history store and no path to open one)."""
+        return self._history_store is not None or bool(self._history_path)
+
+    def reload_calorie_model(self) -> bool:
+        """
+        Switch to the latest published calorie model if it differs from the one in use.
+        Returns True when a new version was loaded; on failure the current model is kept.
+        """
+        self._model_checked_at = time.monotonic()
+        if not self.model_dir:
+            return False
+        version = latest_model_version(self.model_dir)
+        if version is None or version == self.model_version:
+            return False
+        try:
+            model, meta = load_model_version(self.model_dir, version)
+        except Exception as e:
+            print("Failed to load calorie model version", version, "Error:", e)
+            metrics.incr("model_load_failure")
+            return False
+        # a single attribute swap, so concurrent predictions see either the old or the new model
+        self.calorie_model = model
+        self.model_version = version
+        print("Loaded calorie model", version, "from", self.model_dir)
+        return True
+
+    def _check_model_version(self):
+        if self.model_dir and time.monotonic() - self._model_checked_at >= self.model_check_interval:
+            self.reload_calorie_model()
+
+    def _initialize_food_database(self, catalog_path: str) -> FoodCatalog:
+        # Foods live in an external file: foods.csv, or a directory of .npy arrays (memory-mapped)
+        return FoodCatalog.load(catalog_path)
+
+    def predict_calories_ml(self, user: UserProfile = None):
+        """Use trained ML model if available; otherwise fall back to Harris-Benedict calculation."""
+        if user is None:
+            user = self.user_profile
+        return float(self.predict_calories_batch([user])[0])
+
+    def predict_calories_batch(self, profiles: List[UserProfile]) -> np.ndarray:
+        """Daily calories for many profiles in one vectorized pass (ML model, else Harris-Benedict)."""
+        self._check_model_version()
+        return predict_calories_batch(
+            self.calorie_model,
+            age=[u.age for u in profiles],
+            weight=[u.weight for u in profiles],
+            height=[u.height for u in profiles],
+            activity=np.array([u.activity_level for u in profiles], dtype=object),
+            goal=np.array([u.goal for u in profiles], dtype=object),
+            male=[u.gender.lower() == "male" for u in profiles],
+        )
+
+    def calculate_daily_needs(self, user: UserProfile = None):
+        """Return dict with calories, protein(g), carbs(g), fats(g) using ML-predicted calories."""
+        if user is None:
+            user = self.user_profile
+        return self._daily_needs_from_calories(self.predict_calories_ml(user), user)
+
+    def _daily_needs_from_calories(self, daily_calories, user: UserProfile):
+        # Keep macro splits same as before (you can make this ML later)
+        if "vegan" in user.dietary_restrictions:
+            protein_ratio, carbs_ratio, fats_ratio = 0.25, 0.55, 0.20
+        elif user.goal == "lose":
+            protein_ratio, carbs_ratio, fats_ratio = 0.40, 0.35, 0.25
+        elif user.goal == "gain":
+            protein_ratio, carbs_ratio, fats_ratio = 0.30, 0.50, 0.20
+        else:
+            protein_ratio, carbs_ratio, fats_ratio = 0.30, 0.40, 0.30
+
+        return {
+            "calories": round(daily_calories),
+            "protein": round(daily_calories * protein_ratio / 4),
+            "carbs": round(daily_calories * carbs_ratio / 4),
+            "fats": round(daily_calories * fats_ratio / 9)
+        }
+
+    def filter_foods_by_restrictions(self, foods: List[FoodItem], user: UserProfile = None) -> List[FoodItem]:
+        if user is None:
+            user = self.user_profile
+        if foods is self.food_database:
+            # the recommender indexes this exact list, so reuse its flag bitmask and allergen postings
+            mask = self.recommender.allowed_mask(user.dietary_restrictions, user.allergies)
+            return [foods[i] for i in np.flatnonzero(mask)]
+        filtered_foods = list(foods)
+        for restriction in user.dietary_restrictions:
+            filtered_foods = [
+                food for food in filtered_foods 
+                if restriction.lower() in [flag.lower() for flag in food.dietary_flags]
+            ]
+        if user.allergies and filtered_foods:
+            # ad-hoc lists have no index: one vectorized substring test per allergen over the lower-cased names
+            names = np.char.lower(np.array([food.name for food in filtered_foods], dtype=str))
+            keep = np.ones(len(filtered_foods), dtype=bool)
+            for allergen in user.allergies:
+                keep &= np.char.find(names, allergen.lower()) < 0
+            filtered_foods = [food for food, k in zip(filtered_foods, keep) if k]
+        return filtered_foods
+
+    def generate_meal_plan(self, mode: str = "greedy", time_budget: float = 0.05) -> List[List[FoodItem]]:
+        """
+        ML-driven meal plan: for each meal, get candidates from recommender and assemble greedily.
+        mode="solver" instead fits foods and portion sizes for the whole day to the calorie and
+        macro targets (bounded by time_budget seconds).
+        """
+        meal_plan = self.build_meal_plan(self.user_profile, mode=mode, time_budget=time_budget)
+        # Save history and return
+        self.save_meal_plan_to_history(meal_plan)
+        return meal_plan
+
+    @timed("plan_multi_day")
+    def generate_plan(self, days: int = 7, user: UserProfile = None, save_history: bool = True,
+                      max_uses_per_day: int = 1, max_uses: int = None) -> List[List[List[FoodItem]]]:
+        """
+        Plan `days` consecutive days at once. Daily needs, the preference vector and the candidate
+        list are computed once; meals are then assembled with food-usage counts carried across
+        meals and days, so a food appears at most max_uses_per_day times a day and max_uses times
+        overall (None = no limit). Returns one meal plan per day; history gets one entry per day,
+        dated from today onward.
+        """
+        if user is None:
+            user = self.user_profile
+        daily_needs = self.calculate_daily_needs(user)
+        calories_per_meal = max(150, daily_needs["calories"] / max(1, user.meals_per_day))
+        user_vec = self.recommender.user_vectors([self._preference_vector(user)], user.goal)[0]
+        candidate_idx = self.recommender.recommend_candidates_batch(
+            user_vec[None, :], top_k=60, dietary_restrictions=user.dietary_restrictions,
+            allergies=user.allergies, user_ids=[user.user_id])[0]
+        rows_by_day = self.recommender.assemble_days(
+            candidate_idx, calories_per_meal, days, user.meals_per_day, tol=0.25,
+            max_uses_per_day=max_uses_per_day, max_uses=max_uses)
+
+        plans = []
+        available_foods = None
+        for day in rows_by_day:
+            meal_plan = []
+            for rows in day:
+                with metrics.timer("fooditem_mapping"):
+                    meal_items = [self.food_database[r] for r in rows]
+                if not meal_items:
+                    if available_foods is None:
+                        available_foods = self.filter_foods_by_restrictions(self.food_database, user)
+                    meal_items = self._random_meal(available_foods)
+                meal_plan.append(meal_items)
+            plans.append(meal_plan)
+
+        if save_history:
+            today = datetime.now()
+            entries = [self.history_entry(plan, user, (today + timedelta(days=d)).strftime("%Y-%m-%d"))
+                       for d, plan in enumerate(plans)]
+            user.meal_history.extend(entries)
+            self.write_history_entries(entries)
+        return plans
+
+    @timed("plan_total")
+    def build_meal_plan(self, user: UserProfile, mode: str = "greedy", time_budget: float = 0.05,
+                        progress=None, daily_needs: Dict = None) -> List[List[FoodItem]]:
+        """
+        Plan for the given profile without touching self.user_profile or writing history,
+        so one planner can serve many requests concurrently.
+        progress, if given, is called as progress(meals_done, meals_total) after each meal
+        (it may raise to abandon the plan).
+        daily_needs: calculate_daily_needs(user), when the caller already has it.
+        """
+        if daily_needs is None:
+            daily_needs = self.calculate_daily_needs(user)
+        if mode == "solver":
+            meal_plan = self._build_meal_plan_solver(user, time_budget, daily_needs)
+            if progress is not None:
+                progress(len(meal_plan), len(meal_plan))
+            return meal_plan
+        meal_plan = []
+        calories_per_meal = max(150, daily_needs["calories"] / max(1, user.meals_per_day))  # avoid too low
+
+        # build dietary restrictions list and allergies
+        diet_restr = user.dietary_restrictions
+        allergies = user.allergies
+
+        # Ready preference vector (goal prototype when the user has no state yet)
+        user_vec = self.recommender.user_vectors([self._preference_vector(user)], user.goal)[0]
+
+        available_foods = None
+        for meal_idx in range(user.meals_per_day):
+            # candidates + greedy assembly targeting calories_per_meal (cached across meals and users)
+            rows = self.recommender.recommend_meal(
+                user_vec,
+                top_k=60,
+                dietary_restrictions=diet_restr,
+                allergies=allergies,
+                calorie_target=calories_per_meal,
+                tol=0.25,
+                user_id=user.user_id
+            )
+            with metrics.timer("fooditem_mapping"):
+                meal_items = [self.food_database[r] for r in rows]
+            # If recommender returned empty, fallback to random (keeps system robust)
+            if not meal_items:
+                if available_foods is None:
+                    available_foods = self.filter_foods_by_restrictions(self.food_database, user)
+                meal_items = self._random_meal(available_foods)
+            meal_plan.append(meal_items)
+            if progress is not None:
+                progress(meal_idx + 1, user.meals_per_day)
+
+        return meal_plan
+
+    def _build_meal_plan_solver(self, user: UserProfile, time_budget: float, daily_needs: Dict) -> List[List[FoodItem]]:
+        candidates_df = self.recommender.recommend_candidates(
+            user_vec=self._preference_vector(user),
+            goal=user.goal,
+            top_k=60,
+            dietary_restrictions=user.dietary_restrictions,
+            allergies=user.allergies,
+            user_id=user.user_id
+        )
+        # items_df keeps a RangeIndex, so the candidate index labels are catalog row positions
+        day = self.recommender.assemble_day(candidates_df.index.values, daily_needs,
+                                            user.meals_per_day, time_budget=time_budget)
+        meal_plan = []
+        available_foods = None
+        for meal in day:
+            with metrics.timer("fooditem_mapping"):
+                meal_items = [self.food_database[pos].scaled(scale) for pos, scale in meal]
+            if not meal_items:
+                if available_foods is None:
+                    available_foods = self.filter_foods_by_restrictions(self.food_database, user)
+                meal_items = self._random_meal(available_foods)
+            meal_plan.append(meal_items)
+        return meal_plan
+
+    @timed("plan_batch_total")
+    def generate_meal_plans(self, profiles: List[UserProfile], save_history: bool = True,
+                            pref_vecs: List = None) -> List[List[List[FoodItem]]]:
+        """
+        Batch version of generate_meal_plan for a whole cohort of users.
+        Profiles are grouped by (goal, restrictions, allergies) so filtering, similarity scoring
+        and greedy assembly run once per group as matrix operations instead of once per meal.
+        pref_vecs optionally supplies each profile's preference vector (None entries -> goal prototype)
+        instead of reading the preference store.
+        Returns one meal plan per profile, in the same order as `profiles`.
+        """
+        plans = [None] * len(profiles)
+        groups: Dict[tuple, List[int]] = {}
+        for i, user in enumerate(profiles):
+            key = (user.goal, tuple(sorted(user.dietary_restrictions)), tuple(sorted(user.allergies)))
+            groups.setdefault(key, []).append(i)
+
+        for (goal, diet_restr, allergies), members in groups.items():
+            users = [profiles[i] for i in members]
+            if pref_vecs is None:
+                vecs = [self._preference_vector(u) for u in users]
+            else:
+                vecs = [pref_vecs[i] for i in members]
+            user_vecs = self.recommender.user_vectors(vecs, goal)
+            candidate_idx = self.recommender.recommend_candidates_batch(
+                user_vecs, top_k=60, dietary_restrictions=list(diet_restr), allergies=list(allergies),
+                user_ids=[u.user_id for u in users])
+            daily_calories = self.predict_calories_batch(users)
+            targets = [max(150, self._daily_needs_from_calories(c, u)["calories"] / max(1, u.meals_per_day))
+                       for c, u in zip(daily_calories, users)]
+            chosen = self.recommender.assemble_meals_batch(candidate_idx, targets, tol=0.25)
+            available_foods = None
+            for i, user, rows in zip(members, users, chosen):
+                # every meal of the day gets the same inputs, so it is assembled once and reused
+                with metrics.timer("fooditem_mapping"):
+                    meal_items = [self.food_database[r] for r in rows]
+                if meal_items:
+                    plans[i] = [list(meal_items) for _ in range(user.meals_per_day)]
+                    continue
+                # the random fallback is drawn per meal, so the day is not one random meal repeated
+                if available_foods is None:
+                    available_foods = self.filter_foods_by_restrictions(self.food_database, user)
+                plans[i] = [self._random_meal(available_foods) for _ in range(user.meals_per_day)]
+
+        if save_history:
+            entries = []
+            for user, plan in zip(profiles, plans):
+                entry = self.history_entry(plan, user)
+                user.meal_history.append(entry)
+                entries.append(entry)
+            self.write_history_entries(entries)
+        return plans
+
+    def _preference_vector(self, user: UserProfile):
+        if self.preferences is None:
+            return None
+        if user.user_id not in self.preferences:
+            # first request for this user in this process: load the stored state, or seed it once
+            # from the last stored plans
+            # (also records users with no plans yet, so their requests stop reading the history)
+            def load_entries():
+                with metrics.timer("history_read"):
+                    return self.history_store.recent_entries(user.user_id, 10)
+            self.preferences.seed_if_absent(user.user_id, load_entries, self._food_feature)
+        return self.preferences.vector(user.user_id)
+
+    def _food_feature(self, name):
+        i = self.food_database.index_of(name)
+        return None if i is None else self.recommender.feature_matrix[i]
+
+    def _random_meal(self, available_foods: List[FoodItem]) -> List[FoodItem]:
+        # original random logic fallback
+        metrics.incr("random_meal_fallback")
+        meal_items = []
+        protein_foods = [food for food in available_foods if food.category == "protein"]
+        if protein_foods:
+            meal_items.append(random.choice(protein_foods))
+        carb_foods = [food for food in available_foods if food.category == "carbs"]
+        if carb_foods:
+            meal_items.append(random.choice(carb_foods))
+        vegetable_foods = [food for food in available_foods if food.category == "vegetable"]
+        for _ in range(2):
+            if vegetable_foods:
+                meal_items.append(random.choice(vegetable_foods))
+        return meal_items
+
+    def save_meal_plan_to_history(self, meal_plan):
+        history_entry = self.history_entry(meal_plan, self.user_profile)
+        self.user_profile.meal_history.append(history_entry)
+        self.write_history_entries([history_entry])
+
+    def history_entry(self, meal_plan, user: UserProfile, date: str = None):
+        return {"date": date or datetime.now().strftime("%Y-%m-%d"), "user_id": user.user_id,
+                "summary": self.get_meal_plan_summary(meal_plan)}
+
+    @timed("history_write")
+    def write_history_entries(self, entries):
+        """Persist history entries (from history_entry) and update the users' preference vectors."""
+        # one transaction for the whole batch
+        try:
+            self.history_store.append_many((e["user_id"], e["date"], e["summary"]) for e in entries)
+        except Exception as e:
+            print("Failed to write history:", e)
+            metrics.incr("history_write_failure")
+            return
+        # fold the new plans into the users' preference vectors (O(foods in each plan))
+        # and, when enabled, into the collaborative model's user factors
+        updates = []
+        collab_updates = []
+        for e in entries:
+            rows = [self.food_database.index_of(f["name"]) for meal in e["summary"]["meals"] for f in meal["foods"]]
+            rows = [r for r in rows if r is not None]
+            updates.append((e["user_id"], [self.recommender.feature_matrix[r] for r in rows]))
+            collab_updates.append((e["user_id"], rows))
+        self.preferences.update_many(updates)
+        if self.recommender.collab is not None:
+            self.recommender.collab.add_plans(collab_updates)
+
+    def nutrition_report(self, period: str = "week", user: UserProfile = None, start: str = None, end: str = None):
+        """
+        Per-period ('day', 'week', 'month') rollup of the user's saved plans with deviation from
+        calculate_daily_needs (see history_analytics.HistoryAnalytics.deviation). Only plans saved
+        since the previous report are read.
+        """
+        if user is None:
+            user = self.user_profile
+        analytics = self._analytics.get(user.user_id)
+        if analytics is None:
+            from history_analytics import HistoryAnalytics
+            analytics = self._analytics[user.user_id] = HistoryAnalytics(self.history_store, user.user_id)
+        analytics.refresh()
+        return analytics.deviation(self.calculate_daily_needs(user), period, start, end)
+
+    def get_meal_plan_summary(self, meal_plan: List[List[FoodItem]]):
+        total_calories = total_protein = total_carbs = total_fats = 0
+        meal_details = []
+        for i, meal in enumerate(meal_plan, 1):
+            mc = sum(food.calories for food in meal)
+            mp = sum(food.protein for food in meal)
+            mcar = sum(food.carbs for food in meal)
+            mf = sum(food.fats for food in meal)
+            total_calories += mc
+            total_protein += mp
+            total_carbs += mcar
+            total_fats += mf
+            meal_details.append({
+                "meal_number": i,
+                "foods": [{"name": food.name, "portion": food.portion} for food in meal],
+                "nutrition": {"calories": round(mc), "protein": round(mp), "carbs": round(mcar), "fats": round(mf)}
+            })
+        return {"total_nutrition": {"calories": round(total_calories), "protein": round(total_protein), "carbs": round(total_carbs), "fats": round(total_fats)},
+                "meals": meal_details}
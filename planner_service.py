@@ -0,0 +1,203 @@
+# planner_service.py
+# Local HTTP planning service (stdlib asyncio, no web framework).
+#   python planner_service.py --port 8080 --workers 8
+#   POST /plan   body: {"profile": {...UserProfile fields...}, "mode": "greedy"|"solver", "save": true}
+#   GET  /health
+#   GET  /metrics  per-stage timings and counters (start with --metrics or DIET_PLANNER_METRICS=1)
+import argparse
+import asyncio
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from planner_core import DietPlanner, UserProfile, number_field
+from instrumentation import metrics
+
+MAX_BODY = 1 << 20
+
+
+class HistoryWriter:
+    """
+    Background thread that persists history entries in batches, so request handlers
+    only enqueue and never wait on SQLite.
+    """
+
+    def __init__(self, planner: DietPlanner, batch_size=200, flush_interval=0.5):
+        self.planner = planner
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._stopping = threading.Event()
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, entry):
+        self._queue.put(entry)
+
+    def stop(self):
+        """Write everything still queued, then stop the thread."""
+        self._stopping.set()
+        self._thread.join()
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if batch:
+                # a failing batch is logged and dropped; the writer keeps serving later plans
+                try:
+                    self.planner.write_history_entries(batch)
+                except Exception as e:
+                    print("History writer failed on a batch of", len(batch), "entries:", e)
+                    metrics.incr("history_write_failure")
+
+
+class PlanningService:
+    """
+    Stateless request handling: each request carries its own profile, a thread pool runs the
+    planning against one shared planner and history writes go through a HistoryWriter.
+    Workers only read the recommender, catalog and calorie model; the one thing they write is
+    the preference store when a user's state is first seeded (PreferenceStore.seed_if_absent
+    serializes that per user).
+    """
+
+    def __init__(self, planner: DietPlanner = None, workers=4):
+        self.planner = planner or DietPlanner()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="planner")
+        self.history_writer = HistoryWriter(self.planner)
+
+    def plan(self, payload):
+        """Handle one plan request (runs on a worker thread). Returns the JSON-able response."""
+        if not isinstance(payload, dict):
+            raise ValueError("request body must be a JSON object")
+        profile_data = payload.get("profile", payload)
+        if not isinstance(profile_data, dict):
+            raise ValueError("profile must be a JSON object")
+        user = UserProfile.from_dict(profile_data)
+        mode = payload.get("mode", "greedy")
+        if mode not in ("greedy", "solver"):
+            raise ValueError(f"unknown mode {mode!r}")
+        time_budget = number_field(payload, "time_budget", default=0.05)
+        daily_needs = self.planner.calculate_daily_needs(user)
+        meal_plan = self.planner.build_meal_plan(user, mode=mode, time_budget=time_budget, daily_needs=daily_needs)
+        entry = self.planner.history_entry(meal_plan, user)
+        if payload.get("save", True) and self.planner.saves_history:
+            self.history_writer.submit(entry)
+        return {"user_id": user.user_id, "date": entry["date"], "daily_needs": daily_needs, "plan": entry["summary"]}
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, path, _ = request_line.decode('latin-1').split(' ', 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', 0))
+        if length > MAX_BODY:
+            raise ValueError("request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return method, path, headers, body
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}[status]
+        head = (f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError) as e:
+                    await self._respond(writer, 400, {"error": str(e)}, False)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                if method == 'GET' and path == '/health':
+                    status, payload = 200, {"status": "ok"}
+                elif method == 'GET' and path == '/metrics':
+                    status, payload = 200, metrics.snapshot()
+                elif method == 'POST' and path == '/plan':
+                    try:
+                        status, payload = 200, await loop.run_in_executor(self.executor, self.plan, json.loads(body or b'{}'))
+                    except ValueError as e:
+                        status, payload = 400, {"error": str(e)}
+                    except Exception as e:
+                        print("Plan request failed:", e)
+                        status, payload = 500, {"error": "internal error"}
+                else:
+                    status, payload = 404, {"error": "not found"}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        self.history_writer.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Planning service listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=True)
+            self.history_writer.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve meal plans over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--metrics', action='store_true', help="collect per-stage timings (served at /metrics)")
+    parser.add_argument('--collab-weight', type=float, default=0.0,
+                        help="blend collaborative filtering over all users' history into ranking (0 = off)")
+    parser.add_argument('--snapshot', help="start from a planner snapshot (see planner_snapshot.py) instead of building")
+    parser.add_argument('--history', help="with --snapshot: history database to save plans to and read preferences "
+                                          "from (opened on first use; plan-only when omitted)")
+    args = parser.parse_args()
+    if args.snapshot and args.collab_weight > 0 and not args.history:
+        parser.error("--collab-weight with --snapshot needs --history")
+    if args.metrics:
+        metrics.enable()
+    if args.snapshot:
+        from planner_snapshot import load_snapshot
+        planner = load_snapshot(args.snapshot, history_path=args.history)
+        if args.collab_weight > 0:
+            # the snapshot holds no collaborative model; fit it from the planner's history store
+            from collab_filter import CollaborativeFilter
+            collab = CollaborativeFilter.from_history(planner.history_store, planner.food_database.index_of,
+                                                      n_items=len(planner.food_database))
+            planner.recommender.set_collaborative(collab, weight=args.collab_weight)
+    else:
+        planner = DietPlanner(collab_weight=args.collab_weight) if args.collab_weight > 0 else None
+    service = PlanningService(planner=planner, workers=args.workers)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
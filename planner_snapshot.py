@@ -0,0 +1,133 @@
+# planner_snapshot.py
+# Warm-start snapshot of a fully built planner: catalog columns, normalization constants, flag bitmasks,
+# top-k and allergen indexes and the calorie model coefficients in one memory-mappable file.
+#   python planner_snapshot.py planner.snap            # build a planner once and write the snapshot
+#   planner = load_snapshot('planner.snap')            # plan-only, ready in milliseconds, arrays are mmap views
+#   planner = load_snapshot('planner.snap', history_path='meal_history.db')   # history opened on first use
+import argparse
+import json
+import os
+import struct
+import time
+import numpy as np
+from food_catalog import FoodCatalog
+from food_index import LSHBackend
+from calorie_predictor import LinearCalorieRuntime, load_calorie_model, MODEL_DIR
+from planner_core import DietPlanner
+
+MAGIC = b'DPSNAP01'
+ALIGN = 64
+
+
+def _aligned(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def save_snapshot(planner: DietPlanner, path):
+    """
+    Write the planner's prepared state to `path` (atomically). Layout: MAGIC, 8-byte header length,
+    JSON header (array specs and small metadata), then each array's raw bytes at a 64-byte aligned offset.
+    """
+    rec_arrays, rec_meta = planner.recommender.shared_state()
+    arrays = {'catalog.' + c: col for c, col in planner.food_database.columns.items()}
+    arrays.update({'rec.' + k: v for k, v in rec_arrays.items()})
+    model = planner.calorie_model
+    if isinstance(model, LinearCalorieRuntime):
+        arrays['model.coef'] = model.coef
+        model_meta = {'kind': 'linear', 'intercept': model.intercept, 'features': list(model.features),
+                      'version': planner.model_version}
+    else:
+        # non-linear or missing models are loaded the usual way at startup
+        model_meta = {'kind': 'external'}
+
+    specs, offset = {}, 0
+    for key, arr in arrays.items():
+        arr = arrays[key] = np.ascontiguousarray(arr)
+        if arr.dtype.hasobject:
+            raise ValueError(f"cannot snapshot object array {key!r}")
+        specs[key] = {'dtype': arr.dtype.str, 'shape': list(arr.shape), 'offset': offset}
+        offset = _aligned(offset + arr.nbytes)
+    header = json.dumps({'arrays': specs, 'rec_meta': rec_meta, 'model': model_meta,
+                         'created': time.time()}).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + struct.pack('<Q', len(header)) + header)
+        for key, arr in arrays.items():
+            f.seek(data_start + specs[key]['offset'])
+            f.write(arr.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+    return path
+
+
+def read_snapshot(path):
+    """
+    Map a snapshot read-only. Returns (arrays dict of zero-copy views, header dict); the views share
+    the page cache, so every process mapping the same file uses one copy of the data.
+    """
+    mm = np.memmap(path, dtype=np.uint8, mode='r')
+    if bytes(mm[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a planner snapshot")
+    (header_len,) = struct.unpack('<Q', bytes(mm[len(MAGIC):len(MAGIC) + 8]))
+    header = json.loads(bytes(mm[len(MAGIC) + 8:len(MAGIC) + 8 + header_len]))
+    data_start = _aligned(len(MAGIC) + 8 + header_len)
+    arrays = {}
+    for key, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        start = data_start + spec['offset']
+        nbytes = int(np.prod(spec['shape'], dtype=np.int64)) * dtype.itemsize
+        arrays[key] = mm[start:start + nbytes].view(dtype).reshape(spec['shape'])
+    return arrays, header
+
+
+def load_snapshot(path, history_path=None, cache_size=4096, model_dir=MODEL_DIR,
+                  model_check_interval=5.0, ann_backend=None):
+    """
+    Build a ready DietPlanner from a snapshot without parsing foods.csv, re-normalizing features,
+    re-indexing or unpickling the calorie model. By default the planner is plan-only (see
+    DietPlanner.from_components); with history_path the history and preference stores are opened
+    on the first saved plan or preference lookup, not here. Newer published model versions are still picked up.
+    The ANN backend the planner was saved with (e.g. LSH) is rebuilt over the mapped index rows;
+    ann_backend replaces it.
+    """
+    from recommender import SimpleRecommender
+    arrays, header = read_snapshot(path)
+    catalog = FoodCatalog({k[len('catalog.'):]: v for k, v in arrays.items() if k.startswith('catalog.')})
+    rec = SimpleRecommender.from_state(
+        catalog, {k[len('rec.'):]: v for k, v in arrays.items() if k.startswith('rec.')}, header['rec_meta'],
+        ann_backend=ann_backend)
+    rec.enable_cache(cache_size)
+    model_meta = header['model']
+    if model_meta['kind'] == 'linear':
+        model = LinearCalorieRuntime(arrays['model.coef'], model_meta['intercept'], model_meta['features'])
+    else:
+        model = load_calorie_model()
+    planner = DietPlanner.from_components(catalog, rec, model, history_path=history_path)
+    planner.model_version = model_meta.get('version')
+    planner.model_dir = model_dir
+    planner.model_check_interval = model_check_interval
+    planner._model_checked_at = time.monotonic()
+    return planner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a planner and write a warm-start snapshot.")
+    parser.add_argument('output', help="snapshot file to write (e.g. planner.snap)")
+    parser.add_argument('--catalog', default='foods.csv', help="foods.csv or a .npy catalog directory")
+    parser.add_argument('--lsh', action='store_true',
+                        help="give the top-k index an LSH backend (recorded in the snapshot and rebuilt on load)")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    planner = DietPlanner(catalog_path=args.catalog, ann_backend=LSHBackend() if args.lsh else None)
+    built = time.perf_counter()
+    save_snapshot(planner, args.output)
+    saved = time.perf_counter()
+    load_snapshot(args.output)
+    print(f"Built planner in {built - start:.3f}s, wrote {args.output} ({os.path.getsize(args.output)} bytes) "
+          f"in {saved - built:.3f}s, snapshot loads in {time.perf_counter() - saved:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# preferences.py
+import sqlite3
+import threading
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS preferences (
+    user_id TEXT PRIMARY KEY,
+    vec_sum BLOB NOT NULL,
+    weight REAL NOT NULL,
+    n_plans INTEGER NOT NULL
+);
+"""
+
+
+class PreferenceStore:
+    """
+    Per-user preference vectors kept up to date as plans are saved.
+    Each user has an exponentially decayed running sum of the feature rows of the foods they were given
+    plus the matching decayed count; the preference vector is sum / weight. Saving a plan costs
+    O(foods in the plan) and a plan request reads a ready vector instead of re-parsing history.
+    State is persisted to the `preferences` table (same SQLite file as the history); a user's row is
+    read on first access, so opening the store costs nothing and only touched users are held in memory.
+    """
+
+    def __init__(self, path='meal_history.db', decay=0.9):
+        self.decay = decay
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._state = {}
+        # per-user locks held while a user's state is seeded (see seed_if_absent)
+        self._seed_locks = {}
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __contains__(self, user_id):
+        """True when the user's state is in memory (loaded or seeded by seed_if_absent)."""
+        return user_id in self._state
+
+    def _load(self, user_ids):
+        # caller holds self._lock; reads the stored rows of users not in memory yet
+        missing = [u for u in dict.fromkeys(user_ids) if u not in self._state]
+        for i in range(0, len(missing), 500):
+            chunk = missing[i:i + 500]
+            rows = self._conn.execute("SELECT * FROM preferences WHERE user_id IN (%s)" % ",".join("?" * len(chunk)),
+                                      chunk)
+            for user_id, vec_sum, weight, n_plans in rows:
+                self._state[user_id] = (np.frombuffer(vec_sum, dtype=float).copy(), weight, n_plans)
+
+    def vector(self, user_id):
+        """Current preference vector for a user, or None if nothing has been recorded yet."""
+        state = self._state.get(user_id)
+        if state is None or state[1] <= 0:
+            return None
+        return state[0] / state[1]
+
+    def _apply(self, user_id, feature_rows):
+        feature_rows = np.atleast_2d(np.asarray(feature_rows, dtype=float))
+        state = self._state.get(user_id)
+        if state is None or state[0] is None:
+            vec_sum, weight, n_plans = np.zeros(feature_rows.shape[1]), 0.0, 0
+        else:
+            vec_sum, weight, n_plans = state
+        vec_sum = self.decay * vec_sum + feature_rows.sum(axis=0)
+        weight = self.decay * weight + len(feature_rows)
+        self._state[user_id] = (vec_sum, weight, n_plans + 1)
+        return (user_id, vec_sum.tobytes(), weight, n_plans + 1)
+
+    def update(self, user_id, feature_rows):
+        """Fold one saved plan (feature rows of all its foods) into the user's state and persist it."""
+        self.update_many([(user_id, feature_rows)])
+
+    def update_many(self, updates):
+        """Fold many (user_id, feature_rows) plans in; one transaction for the batch."""
+        updates = [(user_id, feats) for user_id, feats in updates if len(feats)]
+        with self._lock:
+            # fold into the stored state of users not touched by this process yet
+            self._load([user_id for user_id, _ in updates])
+            rows = [self._apply(user_id, feats) for user_id, feats in updates]
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO preferences VALUES (?,?,?,?)", rows)
+
+    def seed_if_absent(self, user_id, load_entries, feature_of):
+        """
+        Bring a user's state into memory once, even when several threads ask at the same time:
+        the stored row is read if there is one, otherwise the state is seeded from load_entries().
+        Concurrent first requests for one user wait on a per-user lock instead of doing it twice.
+        """
+        if user_id in self._state:
+            return
+        with self._lock:
+            lock = self._seed_locks.setdefault(user_id, threading.Lock())
+        with lock:
+            if user_id not in self._state:
+                with self._lock:
+                    self._load([user_id])
+            if user_id not in self._state:
+                self.rebuild_from_history(user_id, load_entries(), feature_of)
+        with self._lock:
+            self._seed_locks.pop(user_id, None)
+
+    def rebuild_from_history(self, user_id, entries, feature_of):
+        """
+        Seed a user's state by replaying saved history entries (oldest first).
+        feature_of(name) returns the feature row for a food name, or None for unknown foods.
+        A user with nothing to replay gets an empty in-memory state, so later requests see the user
+        as seeded and do not query the history again (vector() stays None until a plan is saved).
+        """
+        plans = []
+        for entry in entries:
+            feats = [feature_of(f['name']) for meal in entry['summary']['meals'] for f in meal['foods']]
+            feats = [f for f in feats if f is not None]
+            if feats:
+                plans.append((user_id, feats))
+        self.update_many(plans)
+        with self._lock:
+            self._state.setdefault(user_id, (None, 0.0, 0))
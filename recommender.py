@@ -1,13 +1,18 @@
 # recommender.py
 import numpy as np
-import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
+from food_index import TopKIndex, backend_from_config
+from allergen_index import AllergenIndex
+from food_catalog import FoodCatalog
+from meal_solver import solve_day
+from plan_cache import LRUCache, cache_key
+from instrumentation import metrics, timed
 
 def fooditems_to_dataframe(food_items):
     """
     Convert list of FoodItem objects into a pandas DataFrame with numeric features.
     Assumes each item has attributes: name, calories, protein, carbs, fats, category, portion, dietary_flags
     """
+    import pandas as pd
     rows = []
     for f in food_items:
         # Normalize category into columns later if needed
@@ -25,15 +30,33 @@ def fooditems_to_dataframe(food_items):
     # For now features are nutrition vector; later you can add TF-IDF of ingredients or tags
     return df
 
+def _flag_lists(flag_column):
+    return [[f for f in str(flags).lower().split(',') if f] for flags in flag_column]
+
+def _assembly_columns(catalog, positions=None):
+    # calories and protein_per_cal, the columns greedy assembly ranks and sums candidates by
+    cals = np.asarray(catalog.columns['calories'], dtype=float)
+    protein = np.asarray(catalog.columns['protein'], dtype=float)
+    if positions is not None:
+        cals, protein = cals[positions], protein[positions]
+    return cals, protein / (cals + 1e-6)
+
 class SimpleRecommender:
-    def __init__(self, food_items):
+    def __init__(self, food_items, ann_backend=None):
         """
-        food_items: list of FoodItem objects from DietPlanner
+        food_items: FoodCatalog shared with DietPlanner (or a list of FoodItem objects)
+        ann_backend: optional approximate-nearest-neighbour backend for the top-k index (e.g. food_index.LSHBackend)
         """
-        self.items_df = fooditems_to_dataframe(food_items).reset_index(drop=True)
+        if isinstance(food_items, FoodCatalog):
+            self.catalog = food_items
+        else:
+            self.catalog = FoodCatalog.from_items(food_items)
+        # DataFrame view over the catalog columns is built on first use (see items_df),
+        # so the vectorized batch path never needs pandas
+        self._items_df = None
         # Build feature matrix from nutrition columns (protein, carbs, fats, calories)
         # We scale calories down to avoid dominance (simple normalization)
-        feat = self.items_df[['protein','carbs','fats','calories']].astype(float).values
+        feat = self.catalog.nutrients()
         # normalize per-column (min-max) to keep features comparable
         mins = feat.min(axis=0)
         maxs = feat.max(axis=0)
@@ -42,13 +65,177 @@ class SimpleRecommender:
         self.feature_matrix = (feat - mins) / denom
         self._mins = mins
         self._maxs = maxs
+        self._denom = denom
+        self._build_flag_index()
+        # (calories, protein_per_cal) per row for greedy assembly, kept in step by add_foods
+        self._assembly_cols = _assembly_columns(self.catalog)
+        # top-k retrieval index over the normalized rows
+        self.index = TopKIndex(self.feature_matrix, backend=ann_backend)
+        # optional LRU cache of candidates / assembled meals (see enable_cache);
+        # catalog_version changes whenever foods are added or removed
+        self.cache = None
+        self.catalog_version = 0
+        # optional collaborative scorer blended into candidate ranking (see set_collaborative)
+        self.collab = None
+        self.collab_weight = 0.0
+        self.collab_pool = 4
+
+    def enable_cache(self, maxsize=4096):
+        """Cache candidate lists and assembled meals; returns the cache (use .stats() for hit/miss counts)."""
+        self.cache = LRUCache(maxsize) if maxsize else None
+        return self.cache
+
+    def set_collaborative(self, collab, weight=0.3, pool=4):
+        """
+        Blend a collab_filter.CollaborativeFilter into candidate ranking for users it knows:
+        the content index selects pool * top_k candidates, which are re-ranked by
+        (1 - weight) * cosine + weight * clipped CF score (collab=None turns blending off).
+        """
+        self.collab = collab
+        self.collab_weight = weight if collab is not None else 0.0
+        self.collab_pool = pool
+        if collab is not None:
+            collab.ensure_items(len(self.catalog))
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _blends(self, user_id):
+        return user_id is not None and self.collab is not None and self.collab_weight > 0 and user_id in self.collab
+
+    def _blend(self, positions, content_scores, user_ids, top_k):
+        """Re-rank (n, pool) candidate positions by content + CF score; returns (n, k) positions."""
+        cf, known = self.collab.scores(user_ids, positions)
+        w = np.where(known, self.collab_weight, 0.0)[:, None]
+        blended = (1 - w) * content_scores + w * np.clip(cf, 0.0, 1.0)
+        order = np.argsort(-blended, axis=1, kind='stable')[:, :top_k]
+        return np.take_along_axis(positions, order, axis=1)
+
+    def _catalog_changed(self):
+        self.catalog_version += 1
+        if self.cache is not None:
+            self.cache.clear()
+
+    # arrays that fully describe a built recommender (see shared_state / from_state)
+    STATE_ARRAYS = ('feature_matrix', 'mins', 'maxs', 'denom', 'flag_bits', 'index_vectors', 'index_live') + tuple(
+        'allergen_' + k for k in AllergenIndex.STATE_ARRAYS)
+
+    def shared_state(self):
+        """
+        The prepared arrays of this recommender, so another process can rebuild it with
+        from_state without recomputing normalization, flag bitmasks, index rows or allergen postings.
+        Returns (arrays dict, small picklable metadata dict).
+        """
+        arrays = {
+            'feature_matrix': self.feature_matrix, 'mins': self._mins, 'maxs': self._maxs, 'denom': self._denom,
+            'flag_bits': self.flag_bits,
+            'index_vectors': self.index.vectors, 'index_live': self.index.live_mask,
+        }
+        arrays.update({'allergen_' + k: v for k, v in self.allergen_index.state().items()})
+        backend = self.index.backend
+        return arrays, {'flag_vocab': list(self.flag_vocab),
+                        'ann_backend': backend.config() if backend is not None else None,
+                        'min_rows_for_backend': self.index.min_rows_for_backend}
+
+    @classmethod
+    def from_state(cls, catalog, arrays, meta, ann_backend=None):
+        """
+        Rebuild a recommender over `catalog` from shared_state() output (arrays are used as-is, not copied).
+        The ANN backend recorded in meta is rebuilt over the index rows unless ann_backend is given.
+        """
+        rec = cls.__new__(cls)
+        rec.catalog = catalog
+        rec._items_df = None
+        rec.feature_matrix = arrays['feature_matrix']
+        rec._mins, rec._maxs, rec._denom = arrays['mins'], arrays['maxs'], arrays['denom']
+        rec.flag_vocab = list(meta['flag_vocab'])
+        rec.flag_bit = {f: i for i, f in enumerate(rec.flag_vocab)}
+        rec.flag_bits = arrays['flag_bits']
+        rec._assembly_cols = _assembly_columns(catalog)
+        rec._allergen_index = AllergenIndex.from_state(
+            {k: arrays['allergen_' + k] for k in AllergenIndex.STATE_ARRAYS})
+        if ann_backend is None:
+            ann_backend = backend_from_config(meta.get('ann_backend'))
+        rec.index = TopKIndex.from_normalized(arrays['index_vectors'], live=arrays['index_live'], backend=ann_backend,
+                                              min_rows_for_backend=meta.get('min_rows_for_backend', 5000))
+        rec.cache = None
+        rec.catalog_version = 0
+        rec.collab = None
+        rec.collab_weight = 0.0
+        rec.collab_pool = 4
+        return rec
+
+    @property
+    def items_df(self):
+        """DataFrame view over the catalog columns (no second copy of the nutrient data)."""
+        if self._items_df is None or len(self._items_df) != len(self.catalog):
+            self._items_df = self.catalog.to_dataframe()
+        return self._items_df
+
+    def _build_flag_index(self):
+        """
+        Encode each food's dietary_flags as an integer bitmask (one bit per flag in the vocabulary),
+        so restriction filtering becomes a vectorized AND/compare instead of string scans.
+        Flags are packed into 64-bit words; catalogs with more than 64 distinct flags use several words.
+        """
+        flag_lists = _flag_lists(self.catalog.columns['dietary_flags'])
+        self.flag_vocab = sorted({f for flags in flag_lists for f in flags})
+        self.flag_bit = {f: i for i, f in enumerate(self.flag_vocab)}
+        n_words = max(1, (len(self.flag_vocab) + 63) // 64)
+        self.flag_bits = self._encode_flags(flag_lists, n_words)
+        # allergen / name postings are built on the first allergy check (see allergen_index)
+        self._allergen_index = None
+
+    def _encode_flags(self, flag_lists, n_words):
+        bits = np.zeros((len(flag_lists), n_words), dtype=np.uint64)
+        for row, flags in enumerate(flag_lists):
+            for f in flags:
+                bit = self.flag_bit[f]
+                bits[row, bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return bits
+
+    def _extend_flag_index(self, positions):
+        """Append bitmask rows for new catalog rows only; new flags get the next free bits (more words if needed)."""
+        flag_lists = _flag_lists(np.asarray(self.catalog.columns['dietary_flags'])[positions])
+        for f in sorted({f for flags in flag_lists for f in flags} - set(self.flag_bit)):
+            self.flag_bit[f] = len(self.flag_vocab)
+            self.flag_vocab.append(f)
+        n_words = max(self.flag_bits.shape[1], (len(self.flag_vocab) + 63) // 64)
+        old = self.flag_bits
+        if n_words > old.shape[1]:
+            old = np.hstack([old, np.zeros((len(old), n_words - old.shape[1]), dtype=np.uint64)])
+        self.flag_bits = np.vstack([old, self._encode_flags(flag_lists, n_words)])
+
+    @property
+    def allergen_index(self):
+        """AllergenIndex over the catalog's names (and ingredients), built on first use."""
+        if self._allergen_index is None:
+            self._allergen_index = AllergenIndex.from_catalog(self.catalog)
+        return self._allergen_index
+
+    def search_foods(self, text, limit=20):
+        """Catalog row positions of live foods whose name (or ingredients) contains every word of `text`."""
+        rows = self.allergen_index.search(text)
+        return rows[self.index.live_mask[rows]][:limit]
+
+    def restriction_bits(self, dietary_restrictions):
+        """
+        Return the required-flags bitmask for a list of restrictions,
+        or None if a restriction is not in the flag vocabulary (no food can satisfy it).
+        """
+        required = np.zeros(self.flag_bits.shape[1], dtype=np.uint64)
+        for r in dietary_restrictions or []:
+            bit = self.flag_bit.get(r.lower())
+            if bit is None:
+                return None
+            required[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return required
 
     def _user_vector_from_preferences(self, liked_names=None, goal=None):
         # If liked items exist, average their vectors; otherwise derive from goal: e.g., for 'lose' prefer higher protein per cal
         if liked_names:
-            mask = self.items_df['name'].isin(liked_names)
+            mask = np.isin(self.catalog.columns['name'], list(liked_names))
             if mask.sum() > 0:
-                vecs = self.feature_matrix[mask.values]
+                vecs = self.feature_matrix[mask]
                 return vecs.mean(axis=0)
         # fallback: create vector based on goal
         # goal: 'lose' -> emphasize protein and lower calories; 'gain' -> allow higher calories; 'maintain' balanced
@@ -61,30 +248,65 @@ class SimpleRecommender:
             proto = np.array([0.7, 0.6, 0.4, 0.5])
         return proto
 
-    def recommend_candidates(self, liked_food_names=None, goal=None, top_k=30, dietary_restrictions=None, allergies=None):
+    @timed("candidate_retrieval")
+    def recommend_candidates(self, liked_food_names=None, goal=None, top_k=30, dietary_restrictions=None, allergies=None,
+                             user_vec=None, user_id=None):
         """
         Returns top_k candidate rows (pandas DataFrame) ordered by similarity to user vector,
         also filtered by dietary restrictions and allergies.
+        user_vec: ready preference vector (e.g. from PreferenceStore); derived from liked names / goal when None.
+        user_id: blends in the collaborative scorer for this user (see set_collaborative).
         """
-        user_vec = self._user_vector_from_preferences(liked_food_names, goal)
-        sims = cosine_similarity([user_vec], self.feature_matrix).flatten()
-        rank_idx = sims.argsort()[::-1]
-        candidates = self.items_df.iloc[rank_idx].copy()
-        # Filter by dietary restrictions: each restriction must be present in dietary_flags (simple approach)
-        if dietary_restrictions:
-            def keep_row_flags(flags):
-                flags_l = flags.lower()
-                for r in dietary_restrictions:
-                    if r.lower() not in flags_l:
-                        return False
-                return True
-            candidates = candidates[candidates['dietary_flags'].apply(keep_row_flags)]
-        # Filter allergies by checking name (simple)
-        if allergies:
-            for a in allergies:
-                candidates = candidates[~candidates['name'].str.contains(a, case=False)]
-        return candidates.head(top_k)
+        if user_vec is None:
+            user_vec = self._user_vector_from_preferences(liked_food_names, goal)
+        # Filter by dietary restrictions (flag bitmask) and allergies, then select top_k via the index;
+        # only the winning rows are copied out of items_df
+        key = rank_idx = None
+        if self.cache is not None:
+            key = cache_key('candidates', user_vec, dietary_restrictions, allergies, self.catalog_version, top_k=top_k,
+                            **self._collab_key(user_id))
+            rank_idx = self.cache.get(key)
+        if rank_idx is None:
+            allowed = self.allowed_mask(dietary_restrictions, allergies)
+            if self._blends(user_id):
+                pool, scores = self.index.search(user_vec, top_k=top_k * self.collab_pool, allowed=allowed)
+                rank_idx = self._blend(pool[None, :], scores[None, :], [user_id], top_k)[0]
+            else:
+                rank_idx, _ = self.index.search(user_vec, top_k=top_k, allowed=allowed)
+            if key is not None:
+                self.cache.put(key, rank_idx)
+        return self.items_df.iloc[rank_idx].copy()
+
+    def _collab_key(self, user_id):
+        # extra cache-key parameters when the CF scorer changes the ranking for this user
+        return {'collab': [user_id, self.collab_weight] + self.collab.user_version(user_id)} if self._blends(user_id) else {}
 
+    def recommend_meal(self, user_vec, top_k=30, dietary_restrictions=None, allergies=None, calorie_target=500, tol=0.2,
+                       user_id=None):
+        """
+        Candidates + greedy assembly for one meal, returned as a list of catalog row positions.
+        Same selection as recommend_candidates followed by assemble_meal_greedy, but without
+        building DataFrames, and served from the cache when one is enabled.
+        """
+        key = None
+        if self.cache is not None:
+            key = cache_key('meal', user_vec, dietary_restrictions, allergies, self.catalog_version,
+                            top_k=top_k, calorie_target=round(float(calorie_target), 1), tol=tol,
+                            **self._collab_key(user_id))
+            rows = self.cache.get(key)
+            if rows is not None:
+                metrics.incr("meal_cache_hit")
+                return list(rows)
+            metrics.incr("meal_cache_miss")
+        candidate_idx = self.recommend_candidates_batch(np.asarray(user_vec)[None, :], top_k=top_k,
+                                                        dietary_restrictions=dietary_restrictions, allergies=allergies,
+                                                        user_ids=[user_id])
+        rows = self.assemble_meals_batch(candidate_idx, [calorie_target], tol=tol)[0]
+        if key is not None:
+            self.cache.put(key, tuple(rows))
+        return rows
+
+    @timed("assembly")
     def assemble_meal_greedy(self, candidates_df, calorie_target, tol=0.2):
         """
         Greedy assembly: pick items with better protein_per_calorie until reach target within tolerance.
@@ -107,3 +329,182 @@ class SimpleRecommender:
         if not chosen and not cand.empty:
             chosen.append(cand.iloc[[0]].to_dict('records')[0])
         return chosen
+
+    @timed("assembly_solver")
+    def assemble_day(self, candidate_idx, daily_needs, meals_per_day, time_budget=0.05, **solver_options):
+        """
+        Solver mode: choose foods and portion sizes for every meal of the day at once so the day
+        hits the calorie and protein/carbs/fats targets in daily_needs (see meal_solver.solve_day).
+        candidate_idx: items_df row positions of the candidates, best first.
+        Returns one list per meal of (row position, portion multiplier) pairs.
+        """
+        candidate_idx = np.asarray(candidate_idx, dtype=int)
+        cols = self.catalog.columns
+        nutr = np.column_stack([np.asarray(cols[c], dtype=float)[candidate_idx]
+                                for c in ('calories', 'protein', 'carbs', 'fats')])
+        targets = [daily_needs['calories'], daily_needs['protein'], daily_needs['carbs'], daily_needs['fats']]
+        X = solve_day(nutr, targets, meals_per_day, time_budget=time_budget, **solver_options)
+        return [[(int(candidate_idx[k]), float(X[m, k])) for k in np.flatnonzero(X[m])] for m in range(X.shape[0])]
+
+    @timed("assembly")
+    def assemble_days(self, candidate_idx, calorie_target, days, meals_per_day, tol=0.2,
+                      max_uses_per_day=1, max_uses=None):
+        """
+        Greedy assembly of days * meals_per_day meals from one candidate list, with variety limits.
+        Food-usage counts are kept incrementally across meals and days: a food is skipped once it
+        was used max_uses_per_day times that day or max_uses times in the whole plan (None = no
+        limit), and the least-used foods are tried first (ties keep the protein_per_cal order).
+        Returns one list per day of per-meal lists of items_df row positions.
+        """
+        candidate_idx = np.asarray(candidate_idx, dtype=int).reshape(-1)
+        k = len(candidate_idx)
+        if k == 0:
+            return [[[] for _ in range(meals_per_day)] for _ in range(days)]
+        cals, ppc = self._assembly_cols
+        # same protein_per_cal order as assemble_meals_batch, computed once for the whole plan
+        cand = candidate_idx[np.argsort(-ppc[candidate_idx], kind='stable')]
+        cand_cal = cals[cand].tolist()
+        lower, upper = calorie_target * (1 - tol), calorie_target * (1 + tol)
+        uses = np.zeros(k, dtype=int)
+        plan = []
+        for _ in range(days):
+            uses_today = np.zeros(k, dtype=int)
+            day = []
+            for _ in range(meals_per_day):
+                eligible = uses_today < max_uses_per_day
+                if max_uses is not None:
+                    eligible &= uses < max_uses
+                # stable sort on usage keeps protein_per_cal order among equally used foods
+                order = np.argsort(uses, kind='stable')
+                chosen = []
+                total = 0.0
+                for j in order[eligible[order]].tolist():
+                    if total + cand_cal[j] <= upper:
+                        chosen.append(j)
+                        total += cand_cal[j]
+                        if total >= lower:
+                            break
+                # nothing fits (small target or every food at its limit): take the best-ranked one
+                if not chosen:
+                    chosen = [int(order[eligible[order]][0]) if eligible.any() else int(order[0])]
+                uses[chosen] += 1
+                uses_today[chosen] += 1
+                day.append(cand[chosen].tolist())
+            plan.append(day)
+        return plan
+
+    # ----- batch (vectorized) API used by DietPlanner.generate_meal_plans -----
+
+    def user_vectors(self, pref_vecs, goal=None):
+        """
+        Build one preference vector per user (rows of the returned matrix).
+        pref_vecs: per-user preference vectors (None -> goal prototype), goal shared by the group.
+        """
+        proto = self._user_vector_from_preferences(None, goal)
+        return np.vstack([proto if v is None else v for v in pref_vecs])
+
+    def allowed_mask(self, dietary_restrictions=None, allergies=None):
+        """
+        Boolean mask over items_df rows that pass the restriction and allergy filters
+        (removed foods never pass).
+        Each restriction must be one of the food's dietary_flags; allergies are matched as substrings
+        of the name (and ingredients, when the catalog has them).
+        """
+        if dietary_restrictions:
+            required = self.restriction_bits(dietary_restrictions)
+            if required is None:
+                return np.zeros(len(self.index.live_mask), dtype=bool)
+            live = self.index.live_mask
+            mask = ((self.flag_bits[:len(live)] & required) == required).all(axis=1) & live
+        else:
+            mask = self.index.live_mask.copy()
+        # Allergies exclude every food whose name (or ingredients) contains them, via the postings index
+        return self.allergen_index.exclude(mask, allergies)
+
+    def add_foods(self, food_items):
+        """
+        Add foods without rebuilding: new rows are scaled with the existing min-max constants
+        and appended to the flag bitmask, the allergen postings and the top-k index.
+        Returns their row positions.
+        """
+        positions = self.catalog.extend(food_items)
+        if len(positions) == 0:
+            return positions
+        new_feat = (self.catalog.nutrients(positions) - self._mins) / self._denom
+        self.feature_matrix = np.vstack([self.feature_matrix, new_feat])
+        self._extend_flag_index(positions)
+        cals, ppc = self._assembly_cols
+        new_cals, new_ppc = _assembly_columns(self.catalog, positions)
+        self._assembly_cols = (np.concatenate([cals, new_cals]), np.concatenate([ppc, new_ppc]))
+        if self._allergen_index is not None:
+            self._allergen_index.extend(AllergenIndex.catalog_texts(self.catalog, positions))
+        if self.collab is not None:
+            self.collab.ensure_items(len(self.catalog))
+        positions = self.index.add(new_feat)
+        # bump the version only once every index is updated, so a concurrent request cannot
+        # cache results computed from the old index under the new version
+        self._catalog_changed()
+        return positions
+
+    def remove_foods(self, names):
+        """
+        Remove foods by name from future recommendations (rows keep their positions, so the
+        per-row arrays stay as they are; the index's live mask keeps removed rows out of candidates).
+        """
+        positions = np.flatnonzero(np.isin(self.catalog.columns['name'], list(names)))
+        self.index.remove(positions)
+        self._catalog_changed()
+        return positions
+
+    @timed("candidate_retrieval")
+    def recommend_candidates_batch(self, user_vecs, top_k=30, dietary_restrictions=None, allergies=None, user_ids=None):
+        """
+        Score every user vector against the feature matrix in one matrix product.
+        Returns an (n_users, k) array of items_df row positions ordered by similarity
+        (k = min(top_k, number of allowed items)).
+        user_ids: per-row user ids; rows of users the collaborative scorer knows are re-ranked with it.
+        """
+        allowed = self.allowed_mask(dietary_restrictions, allergies)
+        if user_ids is None or not any(self._blends(u) for u in user_ids):
+            return self.index.search_batch(user_vecs, top_k=top_k, allowed=allowed)
+        pool = self.index.search_batch(user_vecs, top_k=top_k * self.collab_pool, allowed=allowed)
+        qs = np.atleast_2d(np.asarray(user_vecs, dtype=float))
+        qs = qs / np.maximum(np.linalg.norm(qs, axis=1, keepdims=True), 1e-12)
+        content = np.einsum('nd,nkd->nk', qs, self.index.vectors[pool])
+        return self._blend(pool, content, list(user_ids), min(top_k, pool.shape[1]))
+
+    @timed("assembly")
+    def assemble_meals_batch(self, candidate_idx, calorie_targets, tol=0.2):
+        """
+        Vectorized version of assemble_meal_greedy for many users at once.
+        candidate_idx: (n_users, k) row positions from recommend_candidates_batch.
+        calorie_targets: per-user calorie target for one meal.
+        Returns a list (one per user) of chosen items_df row positions.
+        """
+        candidate_idx = np.asarray(candidate_idx, dtype=int)
+        n_users, k = candidate_idx.shape
+        if k == 0:
+            return [[] for _ in range(n_users)]
+        cals, ppc = self._assembly_cols
+        # reorder each user's candidates by protein_per_cal (descending)
+        order = np.argsort(-ppc[candidate_idx], axis=1, kind='stable')
+        cand = np.take_along_axis(candidate_idx, order, axis=1)
+        cand_cal = cals[cand]
+        targets = np.asarray(calorie_targets, dtype=float).reshape(-1)
+        lower = targets * (1 - tol)
+        upper = targets * (1 + tol)
+        total = np.zeros(n_users)
+        done = np.zeros(n_users, dtype=bool)
+        taken = np.zeros((n_users, k), dtype=bool)
+        # walk candidate columns once; every step updates all users together
+        for j in range(k):
+            take = ~done & (total + cand_cal[:, j] <= upper)
+            taken[:, j] = take
+            total += np.where(take, cand_cal[:, j], 0.0)
+            done |= total >= lower
+            if done.all():
+                break
+        # if nothing chosen (e.g., target is small), choose the first sorted item
+        empty = ~taken.any(axis=1)
+        taken[empty, 0] = True
+        return [cand[i][taken[i]].tolist() for i in range(n_users)]
@@ -0,0 +1,8 @@
+# tests/conftest.py
+# The modules live at the repository root (no package), like the benchmarks assume; make them importable.
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'benchmarks'))
@@ -0,0 +1,99 @@
+# tests/test_allergen_index.py
+# AllergenIndex must give exactly the rows plain substring matching gives, or allergy filtering is unsafe.
+import random
+import numpy as np
+from allergen_index import AllergenIndex
+
+WORDS = ['nut', 'peanut', 'butter', 'peanutbutter', 'milk', 'buttermilk', 'soy', 'soya', 'wheat', 'oat',
+         'egg', 'eggplant', 'a', 'an', 'tuna', 'nutella']
+SEPARATORS = [' ', ', ', '\n', '-', ' & ', '(', ')']
+
+
+def _texts(rng, n):
+    texts = []
+    for _ in range(n):
+        parts = [rng.choice(WORDS).capitalize() if rng.random() < 0.3 else rng.choice(WORDS)
+                 for _ in range(rng.randint(1, 5))]
+        text = parts[0]
+        for p in parts[1:]:
+            text += rng.choice(SEPARATORS) + p
+        texts.append(text)
+    return texts
+
+
+def _terms(rng, texts, n):
+    terms = []
+    for _ in range(n):
+        kind = rng.random()
+        if kind < 0.5:
+            # a random slice of some food text: within a word, across separators, or the whole text
+            text = rng.choice(texts)
+            i = rng.randrange(len(text))
+            terms.append(text[i:i + rng.randint(1, 12)])
+        elif kind < 0.8:
+            terms.append(rng.choice(WORDS).upper() if rng.random() < 0.2 else rng.choice(WORDS))
+        else:
+            terms.append(''.join(rng.choice('abnotu -,') for _ in range(rng.randint(1, 4))))
+    return terms
+
+
+def _brute(texts, term):
+    return [i for i, t in enumerate(texts) if term.lower() in t.lower()]
+
+
+def test_matching_rows_equals_substring_matching():
+    rng = random.Random(0)
+    texts = _texts(rng, 400)
+    index = AllergenIndex(texts)
+    for term in _terms(rng, texts, 500):
+        assert index.matching_rows([term]).tolist() == _brute(texts, term), term
+        # memoized answers are the same
+        assert index.matching_rows([term]).tolist() == _brute(texts, term), term
+
+
+def test_several_terms_are_a_union():
+    rng = random.Random(1)
+    texts = _texts(rng, 200)
+    index = AllergenIndex(texts)
+    for _ in range(100):
+        terms = _terms(rng, texts, rng.randint(2, 4))
+        expected = sorted(set().union(*(_brute(texts, t) for t in terms)))
+        assert index.matching_rows(terms).tolist() == expected, terms
+
+
+def test_extend_matches_a_fresh_index():
+    rng = random.Random(2)
+    texts = _texts(rng, 300)
+    index = AllergenIndex(texts[:100])
+    index.matching_rows(['nut'])  # fill the memo, which extend must clear
+    index.extend(texts[100:250])
+    index.extend(texts[250:])
+    assert index.n_rows == len(texts)
+    for term in _terms(rng, texts, 300) + ['nut']:
+        assert index.matching_rows([term]).tolist() == _brute(texts, term), term
+
+
+def test_state_round_trip():
+    rng = random.Random(3)
+    texts = _texts(rng, 100)
+    index = AllergenIndex.from_state(AllergenIndex(texts).state())
+    for term in _terms(rng, texts, 100):
+        assert index.matching_rows([term]).tolist() == _brute(texts, term), term
+
+
+def test_exclude_clears_matching_rows_and_ignores_rows_past_the_mask():
+    texts = ['Peanut Butter', 'Milk', 'Oat milk', 'Rice', 'Cashew nut']
+    index = AllergenIndex(texts)
+    mask = np.ones(4, dtype=bool)
+    index.exclude(mask, ['NUT', 'milk'])
+    assert mask.tolist() == [False, False, False, True]
+    assert index.exclude(np.ones(5, dtype=bool), []).all()
+
+
+def test_search_needs_every_word():
+    texts = ['Peanut Butter', 'Butter', 'Peanut oil', 'Almond butter']
+    index = AllergenIndex(texts)
+    assert index.search('peanut butter').tolist() == [0]
+    assert index.search('BUTTER').tolist() == [0, 1, 3]
+    assert index.search('butter', limit=2).tolist() == [0, 1]
+    assert index.search('  ').tolist() == []
@@ -0,0 +1,128 @@
+# tests/test_collab_filter.py
+# ALS fit / fold-in / refit scheduling, and how SimpleRecommender._blend uses the scores.
+import numpy as np
+from collab_filter import CollaborativeFilter
+from recommender import SimpleRecommender
+from synthetic import make_catalog
+
+GROUP_A = [0, 1, 2, 3, 4]
+GROUP_B = [5, 6, 7, 8, 9]
+
+
+def _two_groups(n_items=12, **params):
+    """Users a0..a9 were given GROUP_A foods, b0..b9 GROUP_B foods; foods 10+ were never given."""
+    params.setdefault('background_refit', False)
+    cf = CollaborativeFilter(n_items, factors=4, **params)
+    cf.add_plans([(f"a{i}", GROUP_A) for i in range(10)] + [(f"b{i}", GROUP_B) for i in range(10)])
+    cf.fit()
+    return cf
+
+
+def _group_means(cf, user_id):
+    scores, known = cf.scores([user_id], [GROUP_A + GROUP_B])
+    assert known.tolist() == [True]
+    return scores[0, :5].mean(), scores[0, 5:].mean()
+
+
+def test_fit_separates_groups():
+    cf = _two_groups()
+    a, b = _group_means(cf, "a0")
+    assert a > b + 0.3
+    a, b = _group_means(cf, "b3")
+    assert b > a + 0.3
+
+
+def test_foods_without_interactions_get_zero_factors():
+    cf = _two_groups()
+    assert not cf.item_factors[10:].any()
+
+
+def test_unknown_users_score_zero():
+    cf = _two_groups()
+    scores, known = cf.scores(["nobody", "a1"], [[0, 5], [0, 5]])
+    assert known.tolist() == [False, True]
+    assert not scores[0].any()
+
+
+def test_fold_in_places_a_new_user():
+    cf = _two_groups()
+    version = cf.user_version("new")
+    cf.add_plans([("new", GROUP_B), ("new", [5, 6])])
+    assert "new" in cf
+    assert cf.user_version("new") != version
+    a, b = _group_means(cf, "new")
+    assert b > a
+
+
+def test_refit_threshold_grows_with_history():
+    cf = _two_groups(refit_every=2, refit_growth=0.5)
+    # the fit saw 20 plans: the next refit is due after max(2, 0.5 * 20) = 10 more
+    for i in range(9):
+        cf.add_plans([(f"a{i}", GROUP_A)])
+    assert not cf.refit_due
+    cf.add_plans([("a9", GROUP_A)])
+    assert cf.refit_due
+    cf.fit()
+    assert not cf.refit_due
+    for i in range(14):
+        cf.add_plans([(f"b{i % 10}", GROUP_B)])
+    # 30 plans fitted now, so 14 new ones are not enough
+    assert not cf.refit_due
+
+
+def test_refit_runs_in_the_background():
+    cf = _two_groups(refit_every=1, refit_growth=0.0)
+    # switched on after the initial fit, so only the plan below can start a refit
+    cf.background_refit = True
+    version = cf.fit_version
+    cf.add_plans([("a0", GROUP_A)])
+    thread = cf._refit_thread
+    assert thread is not None
+    thread.join(timeout=60)
+    assert not thread.is_alive()
+    assert cf.fit_version > version
+    a, b = _group_means(cf, "a0")
+    assert a > b
+
+
+def _recommender(cf, weight=0.5):
+    rec = SimpleRecommender(make_catalog(300, seed=5))
+    rec.set_collaborative(cf, weight=weight)
+    return rec
+
+
+def test_blend_leaves_new_users_in_content_order():
+    rec = _recommender(_two_groups())
+    positions = np.array([[9, 3, 7, 1, 5], [0, 1, 2, 3, 4]])
+    content = np.array([[0.9, 0.8, 0.7, 0.6, 0.5], [0.5, 0.6, 0.7, 0.8, 0.9]])
+    out = rec._blend(positions, content, ["nobody", "also-new"], 3)
+    assert out.tolist() == [[9, 3, 7], [4, 3, 2]]
+
+
+def test_blend_reranks_known_users():
+    rec = _recommender(_two_groups(), weight=0.9)
+    positions = np.array([[5, 6, 0, 1]])
+    content = np.full((1, 4), 0.5)
+    out = rec._blend(positions, content, ["a0"], 2)
+    assert sorted(out[0].tolist()) == [0, 1]
+
+
+def test_blend_with_empty_factors_keeps_content_order():
+    # an unfitted model, and foods nobody was given, both score 0 for every user
+    unfitted = CollaborativeFilter(12, factors=4, background_refit=False)
+    unfitted.add_plans([("a0", GROUP_A)])
+    fitted = _two_groups()
+    positions = np.array([[11, 10, 200, 150]])
+    content = np.array([[0.9, 0.7, 0.6, 0.1]])
+    for cf in (unfitted, fitted):
+        rec = _recommender(cf)
+        assert rec._blend(positions, content, ["a0"], 4).tolist() == positions.tolist()
+
+
+def test_unknown_users_get_plain_content_candidates():
+    rec = _recommender(_two_groups())
+    user_vecs = rec.user_vectors([None, None], 'lose')
+    plain = rec.recommend_candidates_batch(user_vecs, top_k=20, dietary_restrictions=['vegan'])
+    blended = rec.recommend_candidates_batch(user_vecs, top_k=20, dietary_restrictions=['vegan'],
+                                             user_ids=["nobody", None])
+    assert (plain == blended).all()
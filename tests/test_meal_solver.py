@@ -0,0 +1,89 @@
+# tests/test_meal_solver.py
+# Day solver output shape / portion rules, and restriction + allergy safety of every assembly path.
+import numpy as np
+from meal_solver import solve_day
+from recommender import SimpleRecommender
+from synthetic import make_catalog, make_profiles
+
+
+def _needs(user):
+    calories = 22 * user.weight + 6 * user.height - 5 * user.age
+    return {'calories': calories, 'protein': calories * 0.3 / 4, 'carbs': calories * 0.4 / 4,
+            'fats': calories * 0.3 / 9}
+
+
+def _assert_safe(catalog, rows, user):
+    flags = catalog.columns['dietary_flags']
+    names = catalog.columns['name']
+    for r in rows:
+        food_flags = str(flags[r]).lower().split(',')
+        for restriction in user.dietary_restrictions:
+            assert restriction.lower() in food_flags, (names[r], user.dietary_restrictions)
+        for allergen in user.allergies:
+            assert allergen.lower() not in str(names[r]).lower(), (names[r], user.allergies)
+
+
+def test_solve_day_portions_and_supports():
+    rng = np.random.default_rng(0)
+    for trial in range(50):
+        K = int(rng.integers(1, 40))
+        M = int(rng.integers(1, 6))
+        nutr = np.column_stack([rng.uniform(20, 600, K), rng.uniform(0, 40, K),
+                                rng.uniform(0, 80, K), rng.uniform(0, 40, K)])
+        targets = [rng.uniform(1200, 3500), rng.uniform(50, 200), rng.uniform(100, 400), rng.uniform(30, 120)]
+        X = solve_day(nutr, targets, M, time_budget=0.01)
+        assert X.shape == (M, K)
+        used = X > 0
+        # every meal gets food; portions are on the 0.25 grid within [min_portion, max_portion]
+        assert used.any(axis=1).all()
+        assert (X[used] >= 0.5).all() and (X[used] <= 3.0).all()
+        assert np.allclose(X[used] / 0.25, np.round(X[used] / 0.25))
+        assert (used.sum(axis=1) <= 4).all()
+        if K >= M * 4:
+            # candidates are dealt round-robin, so no food appears in two meals
+            assert (used.sum(axis=0) <= 1).all()
+            ks = np.arange(K)
+            for m in range(M):
+                assert (ks[used[m]] % M == m).all()
+
+
+def test_solve_day_without_candidates():
+    assert solve_day(np.zeros((0, 4)), [2000, 100, 200, 60], 3).shape == (3, 0)
+
+
+def test_assembly_respects_restrictions_and_allergies():
+    catalog = make_catalog(3000, seed=1)
+    rec = SimpleRecommender(catalog)
+    removed = rec.remove_foods(catalog.columns['name'][:50])
+    profiles = make_profiles(300, seed=2)
+    for user in profiles:
+        user_vecs = rec.user_vectors([None], user.goal)
+        candidate_idx = rec.recommend_candidates_batch(user_vecs, top_k=60,
+                                                       dietary_restrictions=user.dietary_restrictions,
+                                                       allergies=user.allergies)
+        _assert_safe(catalog, candidate_idx[0], user)
+        assert not np.isin(candidate_idx[0], removed).any()
+        day = rec.assemble_day(candidate_idx[0], _needs(user), user.meals_per_day, time_budget=0.005)
+        assert len(day) == user.meals_per_day
+        _assert_safe(catalog, [pos for meal in day for pos, _ in meal], user)
+        greedy = rec.assemble_meals_batch(candidate_idx, [_needs(user)['calories'] / user.meals_per_day])[0]
+        _assert_safe(catalog, greedy, user)
+        assert set(greedy) <= set(candidate_idx[0].tolist())
+        days = rec.assemble_days(candidate_idx[0], 600, 3, user.meals_per_day)
+        _assert_safe(catalog, [r for d in days for meal in d for r in meal], user)
+
+
+def test_added_foods_are_filtered_like_catalog_foods():
+    catalog = make_catalog(500, seed=3)
+    rec = SimpleRecommender(catalog)
+    rec.allowed_mask(None, ['peanut'])  # build the allergen index before the catalog grows
+    extra = make_catalog(200, seed=4)
+    items = [extra[i] for i in range(len(extra))]
+    rec.add_foods(items)
+    mask = rec.allowed_mask(['vegan'], ['peanut', 'milk'])
+    names = np.char.lower(np.asarray(catalog.columns['name'], dtype=str))
+    flags = catalog.columns['dietary_flags']
+    expected = np.array([('vegan' in str(f).split(',')) and 'peanut' not in n and 'milk' not in n
+                         for f, n in zip(flags, names)])
+    assert len(mask) == len(catalog) == 700
+    assert (mask == expected).all()
@@ -0,0 +1,78 @@
+# tests/test_preferences.py
+# Decayed preference state: update arithmetic, persistence, lazy per-user loading and one-time seeding.
+import threading
+import time
+import numpy as np
+import pytest
+from preferences import PreferenceStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'history.db')
+
+
+def _never_called():
+    raise AssertionError("history must not be read for a user with stored state")
+
+
+def test_updates_are_decayed_means(db_path):
+    store = PreferenceStore(db_path, decay=0.5)
+    assert store.vector("u") is None
+    store.update("u", [[1.0, 0.0], [3.0, 0.0]])
+    assert np.allclose(store.vector("u"), [2.0, 0.0])
+    # sum 0.5 * [4, 0] + [0, 2], weight 0.5 * 2 + 1
+    store.update("u", [[0.0, 2.0]])
+    assert np.allclose(store.vector("u"), [1.0, 1.0])
+    store.close()
+
+
+def test_state_is_loaded_per_user_on_first_access(db_path):
+    store = PreferenceStore(db_path, decay=0.5)
+    store.update_many([("u", [[1.0, 0.0], [3.0, 0.0]]), ("v", [[5.0, 5.0]])])
+    store.update("u", [[0.0, 2.0]])
+    store.close()
+
+    store = PreferenceStore(db_path, decay=0.5)
+    assert "u" not in store and "v" not in store
+    store.seed_if_absent("u", _never_called, lambda name: None)
+    assert np.allclose(store.vector("u"), [1.0, 1.0])
+    assert "v" not in store
+    # a save for a user this process has not touched folds into the stored state
+    store.update("v", [[1.0, 1.0]])
+    assert np.allclose(store.vector("v"), [(0.5 * 5 + 1) / 1.5] * 2)
+    store.close()
+
+
+def test_users_without_history_are_seeded_once(db_path):
+    store = PreferenceStore(db_path)
+    calls = []
+
+    def load_entries():
+        calls.append(1)
+        time.sleep(0.01)
+        return []
+
+    threads = [threading.Thread(target=store.seed_if_absent, args=("new", load_entries, lambda name: None))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    store.seed_if_absent("new", load_entries, lambda name: None)
+    assert len(calls) == 1
+    assert "new" in store and store.vector("new") is None
+    store.update("new", [[2.0, 4.0]])
+    assert np.allclose(store.vector("new"), [2.0, 4.0])
+    store.close()
+
+
+def test_rebuild_from_history_replays_known_foods(db_path):
+    store = PreferenceStore(db_path, decay=0.5)
+    features = {"oats": np.array([1.0, 0.0]), "tofu": np.array([0.0, 1.0])}
+    entries = [{"summary": {"meals": [{"foods": [{"name": "oats"}, {"name": "unknown"}]}]}},
+               {"summary": {"meals": [{"foods": [{"name": "tofu"}]}, {"foods": [{"name": "tofu"}]}]}}]
+    store.seed_if_absent("u", lambda: entries, features.get)
+    # plan 1: sum [1, 0], weight 1; plan 2: sum [0.5, 2], weight 2.5
+    assert np.allclose(store.vector("u"), [0.2, 0.8])
+    store.close()
@@ -2,6 +2,7 @@
 import pandas as pd
 from sklearn.linear_model import LinearRegression
 import joblib
+from calorie_predictor import LinearCalorieRuntime
 
 # Synthetic dataset for calorie prediction.
 # You should expand this with real data later.
@@ -26,4 +27,6 @@ model.fit(X, y)
 
 # Save model
 joblib.dump(model, 'calorie_model.pkl')
-print("✅ Trained and saved calorie_model.pkl")
+# Lightweight runtime (coefficients only) used by the planner without sklearn/joblib
+LinearCalorieRuntime.from_model(model).save('calorie_model.npz')
+print("✅ Trained and saved calorie_model.pkl and calorie_model.npz")